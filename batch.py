@@ -0,0 +1,99 @@
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from graph import *
+from cli import ALGORITHMS, INPUTS, load, diagnostics, run
+
+def build(task, input:str, wtype:EdgeWType, ortype:EdgeOrType):
+    # A task is a file path or an (input, InputType) pair of in-memory data.
+    if isinstance(task, str):
+        return load(task, input, wtype, ortype)
+    data, type = task
+    return Graph(data, type, wtype=wtype, ortype=ortype)
+
+def call_with_timeout(f, timeout):
+    if timeout is None or not hasattr(signal, 'setitimer'):
+        return f()
+    def alarm(signum, frame):
+        raise TimeoutError('Timed out after ' + str(timeout) + 's')
+    old = signal.signal(signal.SIGALRM, alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return f()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old)
+
+def solve_task(task, algorithms, input:str, wtype:EdgeWType, ortype:EdgeOrType):
+    t = time.perf_counter()
+    G = build(task, input, wtype, ortype)
+    report = {'load_seconds': time.perf_counter() - t}
+    report.update(diagnostics(G))
+    report['results'] = {algorithm: run(G, algorithm) for algorithm in algorithms}
+    return report
+
+def solve_chunk(chunk, algorithms, input:str, wtype:EdgeWType, ortype:EdgeOrType, timeout):
+    reports = []
+    for k, task in chunk:
+        try:
+            report = call_with_timeout(lambda: solve_task(task, algorithms, input, wtype, ortype), timeout)
+        except Exception as e:
+            report = {'error': type(e).__name__ + ': ' + str(e)}
+        report['task'] = k
+        if isinstance(task, str):
+            report['file'] = task
+        reports.append(report)
+    return reports
+
+def solve_many(tasks, algorithms=ALGORITHMS, workers:int=None, timeout:float=None, chunk_size:int=8,
+               input:str='edges', wtype:EdgeWType=EdgeWType.UNWEIGHTED, ortype:EdgeOrType=EdgeOrType.UNORIENTED):
+    # Yields one report per task, in completion order; report['task'] is the
+    # position of the task in tasks. Tasks are submitted chunk_size at a time
+    # with at most two chunks per worker in flight, so tasks may be a lazy
+    # iterable of any length. timeout limits each task inside its worker.
+    workers = workers or os.cpu_count() or 1
+    tasks = enumerate(tasks)
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(tasks, chunk_size))
+                if len(chunk) == 0:
+                    break
+                pending.add(pool.submit(solve_chunk, chunk, algorithms, input, wtype, ortype, timeout))
+            if len(pending) == 0:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve many graph files on a process pool and print JSON, one object per file as it finishes.')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('-a', '--algorithms', nargs='+', choices=ALGORITHMS, default=ALGORITHMS)
+    parser.add_argument('-i', '--input', choices=['edges'] + list(INPUTS), default='edges')
+    parser.add_argument('-o', '--oriented', action='store_true')
+    parser.add_argument('-w', '--weighted', action='store_true')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    parser.add_argument('-t', '--timeout', type=float, default=None, help='seconds per graph')
+    parser.add_argument('-c', '--chunk-size', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    wtype = EdgeWType.WEIGHTED if args.weighted else EdgeWType.UNWEIGHTED
+    ortype = EdgeOrType.ORIENTED if args.oriented else EdgeOrType.UNORIENTED
+    status = 0
+    for report in solve_many(args.files, args.algorithms, args.workers, args.timeout, args.chunk_size,
+                             args.input, wtype, ortype):
+        if 'error' in report:
+            status = 1
+        print(json.dumps(report), flush=True)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from graph import *
+
+def random_multigraph(n:int, m:int, rng):
+    return [[str(rng.randrange(n)), str(rng.randrange(n))] for i in range(m)]
+
+def eulerian_graph(n:int, m:int, rng, closed:bool=True):
+    walk = [rng.randrange(n) for i in range(m + (0 if closed else 1))]
+    if closed:
+        walk.append(walk[0])
+    else:
+        while walk[-1] == walk[0]:
+            walk[-1] = rng.randrange(n)
+    return [[str(v), str(u)] for v, u in zip(walk, walk[1:])]
+
+def dirac_graph(n:int, rng):
+    edges = set()
+    for v in range(n):
+        for u in rng.sample(range(n), n // 2 + 1):
+            if u != v:
+                edges.add((min(u, v), max(u, v)))
+    return [[str(v), str(u)] for v, u in sorted(edges)]
+
+def build(li, **kwargs):
+    return Graph(li, InputType.EDGE_LIST, scale=300, size=30, edges=(Point(300, 50), Point(700, 650)), **kwargs)
+
+def setup(name:str, n:int, rng):
+    if name == 'init':
+        li = random_multigraph(n, 4 * n, rng)
+        return lambda: build(li)
+    if name == 'coherent':
+        G = build(random_multigraph(n, 4 * n, rng))
+        def run():
+            G.connectivity.invalidate()
+            G.coherent()
+        return run
+    if name == 'eq_classes':
+        G = build(random_multigraph(n, 4 * n, rng))
+        return G.eq_classes
+    if name == 'eulers_way':
+        return build(eulerian_graph(n, 4 * n, rng, closed=False)).eulers_way
+    if name == 'eulers_cycle':
+        return build(eulerian_graph(n, 4 * n, rng)).eulers_cycle
+    if name == 'gamils_cycle':
+        G = build(dirac_graph(n, rng))
+        def run():
+            G.matrix = None
+            G.gamils_cycle()
+        return run
+    if name == 'gamils_way':
+        G = build(dirac_graph(n, rng))
+        def run():
+            G.matrix = None
+            G.gamils_way()
+        return run
+    if name == 'update_positions':
+        G = build(random_multigraph(n, 2 * n, rng))
+        G.generate_positions(G.edges)
+        G.update_positions(0.01)
+        return lambda: G.update_positions(0.01)
+    if name == 'frame':
+        return frame(build(random_multigraph(n, 2 * n, rng)))
+    if name == 'frame_zoom':
+        return frame(build(random_multigraph(n, 2 * n, rng)), 8)
+    raise ValueError('Unknown benchmark: ' + name)
+
+def frame(G, zoom:float=1):
+    # One frame of program.py's graph layer on SDL's dummy video driver, for
+    # a still layout seen with the camera zoomed by zoom on the middle of the
+    # graph view: the classes and vertexes the spatial grid finds in view,
+    # culled and drawn as there.
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from drawing import Camera, draw_edge, draw_node, edge_visible
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode([1000, 800])
+    background = pygame.Surface((1000, 800))
+    background.fill((255, 255, 255))
+    box = pygame.Rect((G.edges[0].x, G.edges[0].y, G.edges[1].x, G.edges[1].y))
+    G.generate_positions(G.edges)
+    camera = Camera()
+    camera.zoom_at(*box.center, zoom)
+    def run():
+        screen.set_clip(box)
+        screen.blit(background, box, box)
+        view = camera.view(box)
+        for es in G.spatial_index().classes(*view, 300):
+            if edge_visible(es, 300, view):
+                draw_edge(screen, es, 300, 20, camera)
+        x0, y0, x1, y1 = view
+        for v in G.spatial_index().query(x0 - 30, y0 - 30, x1 + 30, y1 + 30):
+            draw_node(screen, v.color, camera.to_screen(v.r.x, v.r.y), max(1, round(30 * camera.zoom)),
+                      name=v.name, borderline=4 if v.stable else 2)
+        screen.set_clip(None)
+        pygame.display.update(box)
+    return run
+
+def measure(name:str, n:int, seed:int, repeat:int):
+    run = setup(name, n, random.Random(seed))
+    times = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t)
+    run = setup(name, n, random.Random(seed))
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'bench': name, 'n': n, 'seed': seed, 'repeat': repeat,
+            'best': min(times), 'mean': sum(times) / len(times), 'peak_bytes': peak}
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+BENCHES = ['init', 'coherent', 'eq_classes', 'eulers_way', 'eulers_cycle',
+           'gamils_cycle', 'gamils_way', 'update_positions', 'frame', 'frame_zoom']
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark graph.py algorithms and the drawing loop.')
+    parser.add_argument('benches', nargs='*', default=BENCHES, help='benchmarks to run, default all')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 200, 400])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.benches:
+        for n in args.sizes:
+            r = measure(name, n, args.seed, args.repeat)
+            results.append(r)
+            print('%-16s n=%-7d best=%.6fs peak=%.1fKiB' % (name, n, r['best'], r['peak_bytes'] / 1024))
+    with open(args.out, 'w') as f:
+        json.dump({'commit': commit(), 'python': platform.python_version(),
+                   'platform': platform.platform(), 'results': results}, f, indent=1)
+
+if __name__ == '__main__':
+    main()
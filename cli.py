@@ -0,0 +1,84 @@
+
+import sys
+import json
+import time
+import argparse
+from graph import *
+from stream import load_edge_list
+
+ALGORITHMS = ['eulers_way', 'eulers_cycle', 'gamils_way', 'gamils_cycle']
+
+INPUTS = {
+    'list': InputType.CONNECTIVITY_LIST,
+    'matrix': InputType.CONNECTIVITY_MATRIX,
+    'incidence': InputType.INIDENCE_MATRIX,
+}
+
+def load(path:str, input:str='edges', wtype:EdgeWType=EdgeWType.UNWEIGHTED, ortype:EdgeOrType=EdgeOrType.UNORIENTED):
+    if path.endswith('.snap'):
+        from snapshot import load_snapshot
+        return load_snapshot(path)
+    if input == 'edges':
+        return load_edge_list(path, wtype, ortype)
+    return Graph(path, INPUTS[input], wtype=wtype, ortype=ortype)
+
+def diagnostics(G):
+    if G.ortype == EdgeOrType.ORIENTED:
+        unbalanced = len([v for v in G.V if sum(map(len, G.adj[v].values())) != sum(map(len, G.radj[v].values()))])
+    else:
+        unbalanced = len([v for v in G.V if v.degree % 2 == 1])
+    return {
+        'n': G.n,
+        'm': G.m,
+        'oriented': G.ortype == EdgeOrType.ORIENTED,
+        'weighted': G.wtype == EdgeWType.WEIGHTED,
+        'components': G.connectivity.components_count(),
+        'coherent': G.coherent(),
+        'odd_vertexes': unbalanced,
+        'least_degree': G.least_degree() if G.n > 0 else None,
+        'dirac': G.is_gamiltons_graph(),
+    }
+
+def run(G, algorithm:str, start=None):
+    t = time.perf_counter()
+    if algorithm == 'eulers_way':
+        way = G.eulers_way(start)
+    else:
+        way = getattr(G, algorithm)()
+    return {'way': [v.name for v in way], 'found': len(way) > 0, 'seconds': time.perf_counter() - t}
+
+def solve(path:str, algorithms, input:str='edges', wtype:EdgeWType=EdgeWType.UNWEIGHTED,
+          ortype:EdgeOrType=EdgeOrType.UNORIENTED, start=None):
+    t = time.perf_counter()
+    G = load(path, input, wtype, ortype)
+    report = {'file': path, 'load_seconds': time.perf_counter() - t}
+    report.update(diagnostics(G))
+    report['results'] = {algorithm: run(G, algorithm, start) for algorithm in algorithms}
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the Euler and Hamilton searches on graph files and print JSON, one object per file.')
+    parser.add_argument('files', nargs='+', help='graph files; .snap files are read as snapshots')
+    parser.add_argument('-a', '--algorithms', nargs='+', choices=ALGORITHMS, default=ALGORITHMS)
+    parser.add_argument('-i', '--input', choices=['edges'] + list(INPUTS), default='edges',
+                        help='format of the non snapshot files, default edge list')
+    parser.add_argument('-o', '--oriented', action='store_true')
+    parser.add_argument('-w', '--weighted', action='store_true')
+    parser.add_argument('-s', '--start', help='start vertex of the Euler\'s way')
+    parser.add_argument('--indent', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    wtype = EdgeWType.WEIGHTED if args.weighted else EdgeWType.UNWEIGHTED
+    ortype = EdgeOrType.ORIENTED if args.oriented else EdgeOrType.UNORIENTED
+    status = 0
+    for path in args.files:
+        try:
+            report = solve(path, args.algorithms, args.input, wtype, ortype, args.start)
+        except (OSError, ValueError) as e:
+            report = {'file': path, 'error': str(e)}
+            status = 1
+        print(json.dumps(report, indent=args.indent))
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import pygame
+from math import pi, tan, atan, cos, sin
+from collections import OrderedDict
+
+class LabelCache:
+    # Fonts are created once per size and rendered labels are kept in a
+    # bounded LRU keyed by (text, size, color, background). rendered counts
+    # the surfaces actually rendered, i.e. the misses.
+
+    def __init__(self, capacity:int=1024):
+        self.capacity = capacity
+        self.fonts = {}
+        self.labels = OrderedDict()
+        self.rendered = 0
+
+    def font(self, size:int):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.SysFont('freesansbold.ttf', size)
+        return font
+
+    def render(self, text:str, size:int, color:tuple, background:tuple=None):
+        key = (text, size, color, background)
+        img = self.labels.get(key)
+        if img is None:
+            img = self.font(size).render(text, True, color, background)
+            self.rendered += 1
+            self.labels[key] = img
+            if len(self.labels) > self.capacity:
+                self.labels.popitem(last=False)
+        else:
+            self.labels.move_to_end(key)
+        return img
+
+labels = LabelCache()
+
+class Camera:
+    # Graph to screen transform of the graph view: screen = r * zoom + shift.
+
+    def __init__(self, zoom:float=1, shift:tuple=(0, 0), min_zoom:float=0.02, max_zoom:float=50):
+        self.zoom = zoom
+        self.shift = shift
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+
+    def to_screen(self, x:float, y:float):
+        return (x * self.zoom + self.shift[0], y * self.zoom + self.shift[1])
+
+    def to_world(self, x:float, y:float):
+        return ((x - self.shift[0]) / self.zoom, (y - self.shift[1]) / self.zoom)
+
+    def points(self, p):
+        z = self.zoom
+        sx, sy = self.shift
+        return [(x * z + sx, y * z + sy) for x, y in p]
+
+    def pan(self, dx:float, dy:float):
+        self.shift = (self.shift[0] + dx, self.shift[1] + dy)
+
+    def zoom_at(self, x:float, y:float, factor:float):
+        # Keeps the graph point under (x, y) in place.
+        wx, wy = self.to_world(x, y)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        self.shift = (x - wx * self.zoom, y - wy * self.zoom)
+
+    def view(self, rect):
+        # Graph coordinates (x0, y0, x1, y1) seen through a screen rect.
+        x0, y0 = self.to_world(rect.left, rect.top)
+        x1, y1 = self.to_world(rect.right, rect.bottom)
+        return x0, y0, x1, y1
+
+def screen_points(camera, p):
+    return p if camera is None else camera.points(p)
+
+def draw_node(screen, color, pos, size, name='',borderline=2):
+    pygame.draw.circle(screen, (0, 0, 0), pos, size+borderline)
+    pygame.draw.circle(screen, color, pos, size)
+
+    if name != '' and size >= 8:
+        img = labels.render(name, size, (0, 0, 0), (255, 255, 255))
+        screen.blit(img, (pos[0] - img.get_width() / 2,
+                          pos[1] - img.get_height() / 2))
+
+def polar_angle(x, y):
+    if x == 0:
+        if y < 0:
+            return 3/2*pi
+        if y > 0:
+            return pi/2
+    if y == 0:
+        if x < 0:
+            return pi
+        if x > 0:
+            return 0
+    if y < 0 and x > 0:
+        gamma = atan(abs(y / x))
+    elif y < 0 and x < 0:
+        gamma = pi - atan(abs(y / x))
+    elif y > 0 and x < 0:
+        gamma = 3/2*pi - atan(abs(x / y))
+    elif y > 0 and x > 0:
+        gamma = 2 * pi - atan(abs(y / x))
+    return gamma
+
+def draw_loop(screen, color, v, scale, pc, n, camera=None):
+    alpha = 2 * pi / n
+    l = 0
+    r = scale / 10
+    dy = 2*r / pc
+    k = 0
+    while k < n: 
+        gamma = alpha * k + pi
+        l = 0
+        p = [[v.r.x, v.r.y]]
+        _p = [[v.r.x, v.r.y]]
+        while l <= pc:
+            y = l * dy
+            x = (r**2 - (y - r)**2)**(1/2)
+            p.append([v.r.x + cos(gamma) * x + sin(gamma) * y, v.r.y - sin(gamma) * x + cos(gamma) * y])
+            _p.append([v.r.x + cos(gamma) * (-x) + sin(gamma) * y, v.r.y - sin(gamma) * (-x) + cos(gamma) * y])
+            l += 1
+        pygame.draw.lines(screen, color, False, screen_points(camera, p), 2)
+        pygame.draw.lines(screen, color, False, screen_points(camera, _p), 2)
+        k += 1
+
+def draw_arc(screen, color, v, u, scale, pc, n, camera=None):
+    _n = n - (n % 2)
+    r = u.r - v.r
+    alpha = atan(scale / r.len()) * 2/6
+    gamma = polar_angle(r.x, r.y)
+    a = r.len() / 2
+    dx = r.len() / pc
+    b0 = a * tan(alpha)
+    d = 2 * b0 / _n
+    k = 0
+    b = b0 - d * k
+    while k < _n / 2:
+        l = 1
+        p = [[v.r.x, v.r.y]]
+        _p = [[v.r.x, v.r.y]]
+        while l < pc:
+            x = l * dx
+            y = b * (1 - (x / a - 1)**2)**(1/2)
+            p.append([v.r.x + cos(gamma) * x + sin(gamma) * y, v.r.y - sin(gamma) * x + cos(gamma) * y])
+            _p.append([v.r.x + cos(gamma) * x + sin(gamma) * (-y), v.r.y - sin(gamma) * x + cos(gamma) * (-y)])
+            l += 1
+        p.append([u.r.x, u.r.y])
+        _p.append([u.r.x, u.r.y])
+        pygame.draw.lines(screen, color, False, screen_points(camera, p), 2)
+        pygame.draw.lines(screen, color, False, screen_points(camera, _p), 2)
+        k += 1
+        b = b0 - d * k
+
+def edge_visible(edges, scale, view):
+    # Bounding box test of an edge class against (x0, y0, x1, y1), with a
+    # margin for its loops, which reach scale / 5 out, or its arcs, which
+    # bulge out by less than 0.3 of their length.
+    e = next(iter(edges))
+    v = e.v.r
+    u = e.u.r
+    if e.v == e.u:
+        m = scale / 5
+    elif len(edges) > 1:
+        m = 0.3 * (abs(v.x - u.x) + abs(v.y - u.y))
+    else:
+        m = 0
+    x0, y0, x1, y1 = view
+    return min(v.x, u.x) - m <= x1 and max(v.x, u.x) + m >= x0 and \
+           min(v.y, u.y) - m <= y1 and max(v.y, u.y) + m >= y0
+
+def draw_edge(screen, edges, scale, pc=10, camera=None):
+    if len(edges) == 0:
+        return
+    e = next(iter(edges))
+    v = e.v
+    u = e.u
+    n = len(edges)
+    if v == u:
+        draw_loop(screen, e.color, v, scale, 2*pc, n, camera)
+    else:
+        if n % 2 == 1:
+            p = screen_points(camera, (v.pos(), u.pos()))
+            pygame.draw.aaline(screen, e.color, p[0], p[1])
+        if n > 1:
+            draw_arc(screen, e.color, v, u, scale, pc, n, camera)
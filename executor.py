@@ -0,0 +1,75 @@
+
+import time
+import threading
+from queue import Queue, Empty
+from graph import *
+
+class Cancelled(Exception):
+    pass
+
+class Job:
+    # One algorithm run on a snapshot of a graph, or on the graph itself when
+    # copy is False and the caller leaves its structure alone until the job
+    # is done. key is the result cache key of the graph at submission,
+    # started and ended the perf_counter() times of the run.
+
+    def __init__(self, G, algorithm:str, start=None, copy:bool=True):
+        self.key = results.key(G, algorithm, start)
+        self.algorithm = algorithm
+        self.start = start
+        self.snapshot = G.copy() if copy else G
+        self.progress = 0.0
+        self.cancelled = threading.Event()
+        self.started = self.ended = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def report(self, done:int, total:int):
+        if self.cancelled.is_set():
+            raise Cancelled(self.algorithm)
+        self.progress = done / max(total, 1)
+
+    def run(self):
+        if self.cancelled.is_set():
+            raise Cancelled(self.algorithm)
+        f = getattr(self.snapshot, self.algorithm)
+        self.started = time.perf_counter()
+        try:
+            if self.start is None:
+                return f(progress=self.report)
+            return f(self.start, progress=self.report)
+        finally:
+            self.ended = time.perf_counter()
+
+class Executor:
+    # Runs submitted jobs one at a time on a daemon thread and hands them
+    # back through a queue as (job, result, error) for poll() to collect,
+    # so the caller never waits on a search.
+
+    def __init__(self):
+        self.jobs = Queue()
+        self.done = Queue()
+        self.worker = threading.Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def submit(self, G, algorithm:str, start=None, copy:bool=True) -> Job:
+        job = Job(G, algorithm, start, copy)
+        self.jobs.put(job)
+        return job
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self.done.put((job, job.run(), None))
+            except Exception as e:
+                self.done.put((job, None, e))
+
+    def poll(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self.done.get_nowait())
+            except Empty:
+                return finished
@@ -1,7 +1,11 @@
 
 from enum import Enum
-from random import randrange
+from collections import OrderedDict
+from collections.abc import MutableMapping, MutableSet, Set
+from random import Random
 from queue import Queue
+from math import sqrt, cos, sin, pi
+from operator import attrgetter
 
 class EdgeOrType(Enum):
     ORIENTED   = 0
@@ -19,6 +23,7 @@ class InputType(Enum):
     NO_INPUT            = 4
 
 class Point:
+    __slots__ = ('x', 'y')
 
     def __init__(self, x:float=0, y:float=0):
         self.x = x
@@ -27,6 +32,11 @@ class Point:
     def copy(self):
         return Point(self.x, self.y)
 
+    def set(self, x:float, y:float):
+        self.x = x
+        self.y = y
+        return self
+
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
     
@@ -36,15 +46,17 @@ class Point:
         return self
     
     def __mul__(self, l:float):
-        return self.copy().__imul__(l)
+        return Point(self.x * l, self.y * l)
     
     def __idiv__(self, l:float):
         self.x /= l
         self.y /= l
         return self
+
+    __itruediv__ = __idiv__
     
     def __truediv__(self, l:float):
-        return self.copy().__idiv__(l)
+        return Point(self.x / l, self.y / l)
     
     def __iadd__(self, other):
         self.x += other.x
@@ -52,7 +64,7 @@ class Point:
         return self
     
     def __add__(self, other):
-        return self.copy().__iadd__(other)
+        return Point(self.x + other.x, self.y + other.y)
     
     def __neg__(self):
         return Point(-self.x, -self.y)
@@ -63,13 +75,26 @@ class Point:
         return self
     
     def __sub__(self, other):
-        return self.copy().__isub__(other)
+        return Point(self.x - other.x, self.y - other.y)
+
+    def axpy(self, l:float, other):
+        self.x += l * other.x
+        self.y += l * other.y
+        return self
+
+    def diff(self, a, b):
+        self.x = a.x - b.x
+        self.y = a.y - b.y
+        return self
     
     def scalar(self, other):
         return self.x * other.x + self.y * other.y
+
+    def len2(self):
+        return self.x * self.x + self.y * self.y
     
     def len(self):
-        return self.scalar(self)**(1/2)
+        return sqrt(self.x * self.x + self.y * self.y)
     
     def pos(self):
         return (int(self.x), int(self.y))
@@ -81,6 +106,7 @@ class Point:
         return str(self)
 
 class Vertex:
+    __slots__ = ('name', 'R', 'stable', 'r', 'v', 'a', 'color', 'index', 'degree')
     count: int = 0
     def __init__(self, name, R:int=0, stable:bool=False, degree:int=0,  \
                                       r:Point=Point(),    \
@@ -119,23 +145,32 @@ class Vertex:
     def __repr__(self):
         return self.name
 
-    def move(self, dt: float, edges, size):
+    def move(self, dt: float, edges, size, damping: float=0):
+        # Returns the squared length of the step.
         if not self.stable:
-            if (0 < self.r.x - edges[0].x - size  < 20 and self.v.x < 0) or \
-               (0 < edges[1].x + edges[0].x - size - self.r.x < 20 and self.v.x > 0):
-                self.v -= Point(self.v.x, 0) * 2
-            if (0 < self.r.y - edges[0].y - size < 20 and self.v.y < 0) or \
-                 (0 < edges[1].y + edges[0].y - size - self.r.y < 20 and self.v.y > 0):
-                self.v -= Point(0, self.v.y) * 2
-            self.r += self.v * dt + self.a * dt**2/2
-            self.v += self.a * dt
-            if self.v.len() > 200:
-                self.v = self.v * 200 / self.v.len()
+            r = self.r
+            v = self.v
+            x, y = r.x, r.y
+            if (0 < r.x - edges[0].x - size  < 20 and v.x < 0) or \
+               (0 < edges[1].x + edges[0].x - size - r.x < 20 and v.x > 0):
+                v.x = -v.x
+            if (0 < r.y - edges[0].y - size < 20 and v.y < 0) or \
+                 (0 < edges[1].y + edges[0].y - size - r.y < 20 and v.y > 0):
+                v.y = -v.y
+            r.axpy(dt, v).axpy(dt**2/2, self.a)
+            v.axpy(dt, self.a)
+            if damping:
+                v *= max(0.0, 1 - damping * dt)
+            if v.len2() > 200**2:
+                v *= 200 / v.len()
+            return (r.x - x)**2 + (r.y - y)**2
+        return 0
 
     def pos(self):
         return self.r.pos()
 
 class Edge:
+    __slots__ = ('index', 'v', 'u', 'name', 'weighted', 'color', 'w')
     count: int = 0
 
     def __init__(self, v:Vertex, u:Vertex, name:str='', weighted:bool=False, w:float=0, color:tuple=(0,0,0)):
@@ -167,8 +202,8 @@ class Edge:
     def __lt__(self, other):
         return self.v < other.v or self.u.name < other.u.name or self.w < other.w
 
-    def __hash__(self):
-        return hash((self.name, self.u.name, self.name, self.weighted, self.w, self.index))
+    # Every edge is distinct, parallel or not, so hash by identity.
+    __hash__ = object.__hash__
     
     def __str__(self):
         if self.weighted:
@@ -182,53 +217,587 @@ class Edge:
     def reverse(self): 
         return Edge(self.u, self.v, self.name, self.weighted, self.w)
 
+class Connectivity:
+    # Union-find over the vertex names of a graph, edge direction ignored.
+    # It is built on the first query; after that insertions are merged in
+    # place, deletions only mark it stale and the next query rebuilds it from
+    # the adjacency index.
+
+    def __init__(self, G):
+        self.G = G
+        self.parent = {}
+        self.size = {}
+        self.count = 0
+        self.valid = False
+
+    def add_vertex(self, v):
+        if self.valid:
+            self.parent[v.name] = v.name
+            self.size[v.name] = 1
+            self.count += 1
+
+    def add_edge(self, v, u):
+        if self.valid:
+            self.union(v.name, u.name)
+
+    def invalidate(self):
+        self.valid = False
+
+    def rebuild(self, progress=None):
+        # Breadth first from each unseen vertex, a whole level at a time with
+        # set operations; every vertex's parent is its component's start.
+        # progress(done, total) counts the arcs scanned, both ways.
+        G = self.G
+        self.parent = {}
+        self.size = {}
+        self.count = 0
+        seen = set()
+        done = 0
+        k = 0
+        for s in G.adj:
+            if s in seen:
+                continue
+            component = {s}
+            level = component
+            while len(level) > 0:
+                found = set()
+                for v in level:
+                    us = G.adj[v]
+                    found.update(us)
+                    ws = G.radj[v]
+                    found.update(ws)
+                    if progress is not None:
+                        done += len(us) + len(ws)
+                        k += 1
+                        if k & 63 == 0:
+                            progress(done, 2 * len(G.E))
+                found -= component
+                component |= found
+                level = found
+            seen |= component
+            self.parent.update(dict.fromkeys([v.name for v in component], s.name))
+            self.size[s.name] = len(component)
+            self.count += 1
+        self.valid = True
+
+    def root(self, v:str):
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def union(self, v:str, u:str):
+        v = self.root(v)
+        u = self.root(u)
+        if v == u:
+            return
+        if self.size[v] < self.size[u]:
+            v, u = u, v
+        self.parent[u] = v
+        self.size[v] += self.size[u]
+        self.count -= 1
+
+    def find(self, v):
+        if not self.valid:
+            self.rebuild()
+        return self.G.vertexes[self.root(str(v))]
+
+    def components_count(self, progress=None):
+        if not self.valid:
+            self.rebuild(progress)
+        return self.count
+
+    def components(self):
+        if not self.valid:
+            self.rebuild()
+        comps = {}
+        for name, v in self.G.vertexes.items():
+            comps.setdefault(self.root(name), []).append(v)
+        return list(comps.values())
+
+class Integrator:
+    # Adaptive time step for the layout. dt shrinks when a step moves some
+    # vertex further than max_shift and grows back while steps stay well
+    # below it; velocities are damped so the layout can settle, and after
+    # rest_steps calm steps in a row it falls asleep until woken.
+
+    def __init__(self, dt:float=0.01, dt_min:float=0.002, dt_max:float=0.05, max_shift:float=4,
+                 damping:float=2, rest_energy:float=0.5, rest_shift:float=0.05, rest_steps:int=30,
+                 wake_on_change:bool=True):
+        # Without wake_on_change only wake() ends a sleep, not a change of
+        # the graph dropping its layout.
+        self.dt = dt
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.max_shift = max_shift
+        self.damping = damping
+        self.rest_energy = rest_energy
+        self.rest_shift = rest_shift
+        self.rest_steps = rest_steps
+        self.wake_on_change = wake_on_change
+        self.energy = 0
+        self.shift = 0
+        self.calm = 0
+        self.asleep = False
+
+    def wake(self):
+        self.calm = 0
+        self.asleep = False
+
+    def update(self, energy:float, shift:float, n:int):
+        # energy is the total kinetic energy, shift the longest step of a vertex.
+        # An empty graph is settled from the start.
+        self.energy = energy
+        self.shift = shift
+        if n == 0:
+            self.asleep = True
+            return
+        if shift > self.max_shift:
+            self.dt = max(self.dt / 2, self.dt_min)
+        elif shift < self.max_shift / 4:
+            self.dt = min(self.dt * 1.25, self.dt_max)
+        if energy < self.rest_energy * n and shift < self.rest_shift:
+            self.calm += 1
+            self.asleep = self.calm >= self.rest_steps
+        else:
+            self.calm = 0
+
+class SpatialGrid:
+    # Uniform grid over vertex positions, a hash of cell -> vertexes whose
+    # centre lies in the cell, for picking and culling. With a graph it also
+    # indexes the edge classes G.drawn_classes() on first use, in a loose
+    # grid: level 0 holds the loops by their vertex's cell, level k > 0 has
+    # cells 2^(k-1) times a quarter cell and holds every other class whose
+    # extent is at most that, under the cell of its midpoint. The classes of
+    # a cell are a dict by id, for quick moves.
+
+    def __init__(self, vertexes, cell:float, G=None):
+        self.cell = cell
+        self.cells = {}
+        self.G = G
+        self.levels = None
+        self.slots = {}
+        self.queries = 0
+        for v in vertexes:
+            self.cells.setdefault(self.key(v.r.x, v.r.y), []).append(v)
+
+    def key(self, x:float, y:float):
+        return (int(x // self.cell), int(y // self.cell))
+
+    def move(self, v, old:Point, classes=()):
+        # v has moved from old to v.r; classes are the edge classes at v.
+        k = self.key(old.x, old.y)
+        new = self.key(v.r.x, v.r.y)
+        if k != new:
+            vs = self.cells[k]
+            vs.remove(v)
+            if len(vs) == 0:
+                del self.cells[k]
+            self.cells.setdefault(new, []).append(v)
+        if self.levels is not None:
+            for es in classes:
+                level, k = self.slots[id(es)]
+                ess = self.levels[level][k]
+                del ess[id(es)]
+                if len(ess) == 0:
+                    del self.levels[level][k]
+                self.insert(es)
+
+    def keys(self, cells, cell:float, x0:float, y0:float, x1:float, y1:float):
+        # The occupied cells meeting the rectangle; walks the occupied cells
+        # instead of the covered ones when the rectangle covers more of them.
+        i0, j0 = int(x0 // cell), int(y0 // cell)
+        i1, j1 = int(x1 // cell), int(y1 // cell)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(cells):
+            return [k for k in cells if i0 <= k[0] <= i1 and j0 <= k[1] <= j1]
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in cells]
+
+    def query(self, x0:float, y0:float, x1:float, y1:float):
+        # Vertexes inside the rectangle.
+        keys = self.keys(self.cells, self.cell, x0, y0, x1, y1)
+        return [v for k in keys for v in self.cells[k] if x0 <= v.r.x <= x1 and y0 <= v.r.y <= y1]
+
+    def level_cell(self, level:int) -> float:
+        return self.cell if level == 0 else self.cell / 4 * (1 << (level - 1))
+
+    def insert(self, es):
+        e = es[0]
+        v = e.v.r
+        u = e.u.r
+        level = 0
+        if e.v != e.u:
+            level = 1 + int(max(abs(v.x - u.x), abs(v.y - u.y)) // (self.cell / 4)).bit_length()
+        while len(self.levels) <= level:
+            self.levels.append({})
+        cell = self.level_cell(level)
+        k = (int((v.x + u.x) / 2 // cell), int((v.y + u.y) / 2 // cell))
+        self.levels[level].setdefault(k, {})[id(es)] = es
+        self.slots[id(es)] = (level, k)
+
+    def classes(self, x0:float, y0:float, x1:float, y1:float, scale:float):
+        # Edge classes that may show in the rectangle when drawn at most
+        # scale / 5 out of their vertex for loops and 0.6 * extent out of
+        # their bounding box for the rest, as the loops and arcs of drawing.py
+        # are; a superset of the visible ones. The first query just returns
+        # every class, as a moving layout drops its grid after each step; the
+        # index is built by the second one.
+        if self.levels is None:
+            self.queries += 1
+            if self.queries == 1:
+                return self.G.drawn_classes()
+            self.levels = []
+            for es in self.G.drawn_classes():
+                self.insert(es)
+        found = []
+        for level, cells in enumerate(self.levels):
+            cell = self.level_cell(level)
+            m = scale / 5 if level == 0 else 1.1 * cell
+            for k in self.keys(cells, cell, x0 - m, y0 - m, x1 + m, y1 + m):
+                found += cells[k].values()
+        return found
+
+    def nearest(self, x:float, y:float, radius:float):
+        # The closest vertex at most radius away, or None.
+        best = None
+        d2 = radius * radius
+        for v in self.query(x - radius, y - radius, x + radius, y + radius):
+            l2 = (v.r.x - x)**2 + (v.r.y - y)**2
+            if l2 <= d2:
+                best = v
+                d2 = l2
+        return best
+
+class AdjacencyMatrix:
+    # n x n adjacency of a graph for constant time edge tests, one int
+    # bitset per row. Row and column n belong to a virtual vertex joined to
+    # every other one, which turns a hamiltonian cycle search into a
+    # hamiltonian way search.
+
+    def __init__(self, G, progress=None):
+        # progress(done, total) counts the arcs set.
+        self.vertexes = list(G.V)
+        n = self.n = len(self.vertexes)
+        idx = {v.name: i for i, v in enumerate(self.vertexes)}
+        name = attrgetter('name')
+        one = ord('1')
+        self.rows = [0] * (n + 1)
+        # A row is spelt as a binary numeral, column 0 last, and parsed by
+        # int() in one go.
+        done = 0
+        for k, (v, us) in enumerate(G.adj.items(), 1):
+            row = bytearray(b'0') * (n + 1)
+            row[n] = one
+            for j in map(idx.__getitem__, map(name, us)):
+                row[j] = one
+            self.rows[idx[v.name]] = int(row[::-1], 2)
+            if progress is not None:
+                done += len(us)
+                if k & 63 == 0:
+                    progress(done, len(G.E))
+        self.rows[n] = (1 << n) - 1
+
+    def set(self, i:int, j:int):
+        self.rows[i] |= 1 << j
+
+    def has(self, i:int, j:int) -> bool:
+        return self.rows[i] >> j & 1 == 1
+
+    def hamilton_cycle(self, n:int, progress=None):
+        # Rotation over the first n vertexes: walk the circular order q and
+        # whenever q[p], q[p+1] are not adjacent pick i with q[p] ~ q[p+i]
+        # and q[p+1] ~ q[p+i+1], then reverse q[p+1 .. p+i]. Dirac's condition
+        # guarantees such i; after n adjacent pairs in a row q is a cycle.
+        # Every reversal adds one or two adjacent pairs to q, whose count is
+        # what progress(done, n) reports.
+        rows = self.rows
+        q = list(range(n))
+        good = sum(rows[q[p]] >> q[(p + 1) % n] & 1 for p in range(n)) if progress is not None else 0
+        p = 0
+        run = 0
+        for k in range(n * (n - 1) + n):
+            if progress is not None and k & 255 == 0:
+                progress(good, n)
+            a = q[p]
+            b = q[(p + 1) % n]
+            if not rows[a] >> b & 1:
+                ra = rows[a]
+                rb = rows[b]
+                for i in range(2, n - 1):
+                    if ra >> q[(p + i) % n] & 1 and rb >> q[(p + i + 1) % n] & 1:
+                        break
+                else:
+                    return []
+                good += 2 - (rows[q[(p + i) % n]] >> q[(p + i + 1) % n] & 1)
+                j = 0
+                while 1 + j < i - j:
+                    x = (p + 1 + j) % n
+                    y = (p + i - j) % n
+                    q[x], q[y] = q[y], q[x]
+                    j += 1
+                run = 0
+            run += 1
+            if run == n:
+                q = q[p + 1:] + q[:p + 1]
+                return q + [q[0]]
+            p = (p + 1) % n
+        return []
+
+def phase_progress(progress, start:int, total:int):
+    # The progress(done, total) callback of a phase of a longer search that
+    # starts once start of its total units are done; the phase's own total
+    # is ignored. None stays None.
+    if progress is None:
+        return None
+    return lambda done, count=None: progress(start + done, total)
+
+def read_rows(path:str, cast=None):
+    with open(path) as f:
+        for line in f:
+            row = line.split()
+            if len(row) > 0:
+                if cast is not None:
+                    row = [row[0]] + [cast(x) if k % 2 == 0 else x for k, x in enumerate(row[1:], 1)]
+                yield row
+
+def load_matrix(input):
+    # .npy files are memory mapped, other paths are parsed as text.
+    import numpy as np
+    if isinstance(input, str):
+        if input.endswith('.npy'):
+            return np.load(input, mmap_mode='r')
+        return np.loadtxt(input, ndmin=2)
+    return np.asarray(input)
+
+PLACEMENTS = ['random', 'circle', 'grid', 'spectral', 'multilevel']
+
+class ResultCache:
+    # Bounded LRU of algorithm results keyed by (graph index, graph version,
+    # algorithm, start vertex name). A graph's version changes with every
+    # structural change, so a stale entry can never be hit again and just
+    # ages out.
+
+    def __init__(self, capacity:int=64):
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, G, algorithm:str, start=None):
+        return (G.index, G.version, algorithm, None if start is None else str(start))
+
+    def lookup(self, key):
+        # The cached result as a fresh list, None when missing.
+        result = self.results.get(key)
+        if result is None:
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return list(result)
+
+    def put(self, key, result):
+        self.results[key] = list(result)
+        self.results.move_to_end(key)
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    def get(self, G, algorithm:str, start=None):
+        key = self.key(G, algorithm, start)
+        result = self.lookup(key)
+        if result is None:
+            self.misses += 1
+            result = getattr(G, algorithm)() if start is None else getattr(G, algorithm)(start)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        self.results.clear()
+
+results = ResultCache()
+
+def row_key(row, oriented:bool):
+    # The edge of an edge list row as (v, u, w), ends ordered when unoriented;
+    # None for a lone vertex row.
+    if len(row) < 2:
+        return None
+    v, u = str(row[0]), str(row[1])
+    if not oriented and u < v:
+        v, u = u, v
+    return v, u, row[2] if len(row) > 2 else 0
+
+def row_names(rows):
+    return {str(name) for row in rows for name in row[:2]}
+
+def diff_rows(old, new, oriented:bool):
+    # The (added, removed) edges, as lists of row keys with repetitions for
+    # parallel edges, and the names of vertexes only old mentions.
+    count = {}
+    for row in new:
+        k = row_key(row, oriented)
+        if k is not None:
+            count[k] = count.get(k, 0) + 1
+    for row in old:
+        k = row_key(row, oriented)
+        if k is not None:
+            count[k] = count.get(k, 0) - 1
+    added = [k for k, c in count.items() for i in range(c)]
+    removed = [k for k, c in count.items() for i in range(-c)]
+    return added, removed, row_names(old) - row_names(new)
+
 class Graph:
+    count: int = 0
     
     def __init__(self, input, type:InputType, wtype: EdgeWType=EdgeWType.UNWEIGHTED, ortype: EdgeOrType=EdgeOrType.UNORIENTED, scale=300, size=15, edges=(Point(), Point(1000,1000))):
+        self.index = Graph.count
+        Graph.count += 1
+        self.version = 0
         self.V = set()
         self.E = set()
+        self.vertexes = {}
+        self.adj = {}
+        self.radj = {}
+        self.layout = None
+        self.theta = None
+        self.integrator = None
+        self.matrix = None
+        self.spatial = None
         self.ortype = ortype
         self.wtype = wtype
-        self.is_coherent = None
+        self.connectivity = Connectivity(self)
         self.delta = float('inf')
         if type == InputType.EDGE_LIST:
             for i in input:
-                if len(i) < 2:
-                    self.V.add(Vertex(i[0]))
-                else:
-                    self.V.update([Vertex(i[0]), Vertex(i[1])])
-
-            for i in input:
+                v = self.vertex(i[0])
                 if len(i) < 2:
                     continue
-                v = Vertex(i[0])
-                u = Vertex(i[1])
-                for j in self.V:
-                    if j == v:
-                        v = j
-                    if j == u:
-                        u = j
-                v.degree += 1
-                if ortype == EdgeOrType.UNORIENTED:
-                    u.degree += 1
-
+                u = self.vertex(i[1])
                 if wtype == EdgeWType.WEIGHTED:
-                    e = Edge(v, u, weighted=True, w=i[2])
+                    self.connect(v, u, i[2])
                 else:
-                    e = Edge(v, u)
-                self.E.add(e)
-                if v != u and ortype == EdgeOrType.UNORIENTED:
-                    self.E.add(e.reverse())
-            self.is_coherent = self.coherent()
+                    self.connect(v, u)
+        elif type == InputType.CONNECTIVITY_LIST:
+            self.load_connectivity_list(input)
+        elif type == InputType.CONNECTIVITY_MATRIX:
+            self.load_connectivity_matrix(input)
+        elif type == InputType.INIDENCE_MATRIX:
+            self.load_incidence_matrix(input)
         self.n = len(self.V)
         self.m = len(self.E)
         self.scale = scale
         self.size = size
         self.edges = edges
 
+    def vertex(self, name):
+        v = self.vertexes.get(str(name))
+        if v is None:
+            v = Vertex(name)
+            self.index_vertex(v)
+        return v
+
+    def connect(self, v, u, w=0):
+        v.degree += 1
+        if self.ortype == EdgeOrType.UNORIENTED:
+            u.degree += 1
+        if self.wtype == EdgeWType.WEIGHTED:
+            e = Edge(v, u, weighted=True, w=w)
+        else:
+            e = Edge(v, u)
+        self.index_edge(e)
+        if v != u and self.ortype == EdgeOrType.UNORIENTED:
+            self.index_edge(e.reverse())
+        return e
+
+    def load_connectivity_list(self, input):
+        # Rows are [v, u1, u2, ...], or [v, u1, w1, u2, w2, ...] for weighted
+        # graphs; a path is read as a text file with one row per line. An
+        # unoriented edge may be listed under one or both of its ends.
+        weighted = self.wtype == EdgeWType.WEIGHTED
+        unoriented = self.ortype == EdgeOrType.UNORIENTED
+        if isinstance(input, str):
+            input = read_rows(input, float if weighted else None)
+        count = {}
+        for row in input:
+            v = str(row[0])
+            if v.endswith(':'):
+                v = v[:-1]
+            v = self.vertex(v)
+            step = 2 if weighted else 1
+            for k in range(1, len(row) - step + 1, step):
+                u = self.vertex(row[k])
+                w = row[k + 1] if weighted else 0
+                if unoriented:
+                    key = (v, u, w)
+                    count[key] = count.get(key, 0) + 1
+                else:
+                    self.connect(v, u, w)
+        for (v, u, w), k in count.items():
+            if v != u and (u, v, w) in count:
+                if v.name > u.name:
+                    continue
+                k = max(k, count[(u, v, w)])
+            for i in range(k):
+                self.connect(v, u, w)
+
+    def load_connectivity_matrix(self, input):
+        # M[i][j] is the number of edges i -> j, or their weight for weighted
+        # graphs; unoriented graphs read only the upper triangle. Vertexes are
+        # named 1..n and the matrix is read in row blocks.
+        import numpy as np
+        M = load_matrix(input)
+        n = M.shape[0]
+        vs = [self.vertex(i + 1) for i in range(n)]
+        weighted = self.wtype == EdgeWType.WEIGHTED
+        rows = max(1, (1 << 22) // max(n, 1))
+        for s in range(0, n, rows):
+            block = np.asarray(M[s:s + rows])
+            if self.ortype == EdgeOrType.UNORIENTED:
+                block = np.triu(block, s)
+            i, j = np.nonzero(block)
+            w = block[i, j]
+            for i, j, w in zip((i + s).tolist(), j.tolist(), w.tolist()):
+                if weighted:
+                    self.connect(vs[i], vs[j], w)
+                else:
+                    for k in range(int(w)):
+                        self.connect(vs[i], vs[j])
+
+    def load_incidence_matrix(self, input):
+        # One column per edge: two nonzero entries for its ends, the positive
+        # one being the tail of an oriented edge, or a single one for a loop.
+        # The absolute value of the entries is the weight of weighted graphs.
+        import numpy as np
+        M = load_matrix(input)
+        n, m = M.shape
+        vs = [self.vertex(i + 1) for i in range(n)]
+        cols = max(1, (1 << 22) // max(n, 1))
+        for s in range(0, m, cols):
+            block = np.asarray(M[:, s:s + cols]).T
+            c, r = np.nonzero(block)
+            w = block[c, r]
+            start = np.flatnonzero(np.r_[True, c[1:] != c[:-1]]) if len(c) > 0 else c
+            count = np.diff(np.r_[start, len(c)])
+            if len(start) != len(block) or count.max(initial=1) > 2:
+                raise ValueError('Every incidence matrix column must have one or two nonzero entries')
+            for k, l in zip(start.tolist(), count.tolist()):
+                v = r[k]
+                u = r[k + l - 1]
+                if w[k] < 0:
+                    v, u = u, v
+                self.connect(vs[v], vs[u], abs(w[k].item()))
+
     def clear(self):
+        self.version += 1
         self.V.clear()
         self.E.clear()
+        self.vertexes.clear()
+        self.adj.clear()
+        self.radj.clear()
+        self.n = 0
+        self.m = 0
+        self.layout = None
+        self.matrix = None
+        self.spatial = None
+        self.connectivity = Connectivity(self)
         self.ortype=EdgeOrType.UNORIENTED
         self.wtype=EdgeWType.UNWEIGHTED
         self.scale = 0
@@ -236,28 +805,76 @@ class Graph:
         self.edges = (Point(0, 0), Point(0, 0))
 
     def copy(self):
-        _G = Graph(InputType.NO_INPUT, [], wtype=self.wtype, ortype=self.ortype, scale=self.scale, size=self.size, edges=self.edges)
-        _G.V = self.copy_vertexs()
-        for e in self.E:
-            v = _G.find_vertex(e.v)
-            u = _G.find_vertex(e.u)
-            _G.E.add(Edge(v, u, e.name, e.weighted, e.w))
+        _G = Graph([], InputType.NO_INPUT, wtype=self.wtype, ortype=self.ortype, scale=self.scale, size=self.size, edges=self.edges)
+        for v in self.copy_vertexs():
+            _G.index_vertex(v)
+        # Whole parallel edge lists at once; the copy's connectivity is not
+        # built yet, so bypassing index_edge leaves nothing stale.
+        for v, us in self.adj.items():
+            _v = _G.vertexes[v.name]
+            for u, es in us.items():
+                _u = _G.vertexes[u.name]
+                _es = [Edge(_v, _u, e.name, e.weighted, e.w) for e in es]
+                _G.adj[_v][_u] = _es
+                _G.radj[_u][_v] = list(_es)
+                _G.E.update(_es)
+        _G.version += 1
         _G.n = self.n
         _G.m = self.m
+        _G.theta = self.theta
         return _G
 
     def find_edge(self, v, u, name='', weighted=False, w=0):
-        e = Edge(v, u, name, weighted, w)
-        for _e in self.E:
-            if e == _e:
+        for _e in self.adj.get(v, {}).get(u, ()):
+            if _e.name == name and _e.weighted == weighted and _e.w == w:
                 return _e
         return None
 
     def find_vertex(self, v):
-        for _v in self.V:
-            if v == _v:
-                return _v
-        return None
+        return self.vertexes.get(str(v))
+
+    def index_vertex(self, v):
+        self.version += 1
+        self.V.add(v)
+        self.vertexes[v.name] = v
+        self.adj[v] = {}
+        self.radj[v] = {}
+        self.layout = None
+        self.matrix = None
+        self.spatial = None
+        self.connectivity.add_vertex(v)
+
+    def unindex_vertex(self, v):
+        self.version += 1
+        self.V.discard(v)
+        del self.vertexes[v.name]
+        del self.adj[v]
+        del self.radj[v]
+        self.layout = None
+        self.matrix = None
+        self.spatial = None
+        self.connectivity.invalidate()
+
+    def index_edge(self, e):
+        self.version += 1
+        self.E.add(e)
+        self.matrix = None
+        self.spatial = None
+        self.adj[e.v].setdefault(e.u, []).append(e)
+        self.radj[e.u].setdefault(e.v, []).append(e)
+        self.connectivity.add_edge(e.v, e.u)
+
+    def unindex_edge(self, e):
+        self.version += 1
+        self.E.discard(e)
+        self.matrix = None
+        self.spatial = None
+        for index, v, u in ((self.adj, e.v, e.u), (self.radj, e.u, e.v)):
+            es = index[v][u]
+            es.remove(e)
+            if len(es) == 0:
+                del index[v][u]
+        self.connectivity.invalidate()
 
     def __eq__(self, other):
         return self.V == other.V and self.E == other.E
@@ -274,13 +891,108 @@ class Graph:
     def __repr__(self):
         return str(self)
 
-    def generate_positions(self, edges = (Point(0, 0), Point(1000, 1000))):
-        for v in self.V:
-            r = Point(0, 0)
-            while r in [v.r for v in self.V]:
-                r = Point(randrange(int(1.2*edges[0].x + self.size), int(0.8*edges[1].x - self.size)), \
-                            randrange(int(1.2*edges[0].y + self.size), int(0.8*edges[1].y - self.size)))
-            v.r = r
+    def generate_positions(self, edges = (Point(0, 0), Point(1000, 1000)), placement:str='random', seed=None):
+        # placement is one of PLACEMENTS; the same seed gives the same layout.
+        rng = Random(seed)
+        order = self.placement_order()
+        if placement == 'random':
+            taken = set()
+            for v in order:
+                r = None
+                while r is None or r in taken:
+                    r = (rng.randrange(int(1.2*edges[0].x + self.size), int(0.8*edges[1].x - self.size)), \
+                         rng.randrange(int(1.2*edges[0].y + self.size), int(0.8*edges[1].y - self.size)))
+                taken.add(r)
+                v.r = Point(*r)
+            self.layout = None
+            self.spatial = None
+            return
+        lo = Point(edges[0].x + 2*self.size, edges[0].y + 2*self.size)
+        hi = Point(edges[0].x + edges[1].x - 2*self.size, edges[0].y + edges[1].y - 2*self.size)
+        if placement == 'circle':
+            # Neighbours end up close on the circle thanks to the BFS order.
+            c = (lo + hi) / 2
+            d = (hi - lo) / 2
+            t0 = rng.random() * 2 * pi
+            for k, v in enumerate(order):
+                t = t0 + 2 * pi * k / len(order)
+                v.r = Point(c.x + d.x * cos(t), c.y + d.y * sin(t))
+            self.layout = None
+            self.spatial = None
+            return
+        if placement == 'multilevel':
+            try:
+                from layout import multilevel_positions
+                r = multilevel_positions(self, order, (lo.x, lo.y), (hi.x, hi.y), rng.getrandbits(32))
+            except ImportError:
+                return self.generate_positions(edges, 'circle', seed)
+            for v, (x, y) in zip(order, r.tolist()):
+                v.r = Point(x, y)
+                v.v = Point()
+            self.layout = None
+            self.spatial = None
+            return
+        if placement == 'spectral':
+            try:
+                from layout import spectral_positions
+                points = spectral_positions(self, order, rng.getrandbits(32))
+            except ImportError:
+                return self.generate_positions(edges, 'circle', seed)
+        elif placement == 'grid':
+            points = [(rng.random(), rng.random()) for v in order]
+        else:
+            raise ValueError('Unknown placement: ' + placement)
+        self.snap_positions(order, points, lo, hi)
+        self.layout = None
+        self.spatial = None
+
+    def placement_order(self):
+        # Vertexes sorted by name, then breadth first from each unvisited one,
+        # so that placements do not depend on set order and neighbours follow
+        # each other.
+        seen = set()
+        order = []
+        for s in sorted(self.V):
+            if s in seen:
+                continue
+            seen.add(s)
+            k = len(order)
+            order.append(s)
+            while k < len(order):
+                v = order[k]
+                k += 1
+                for us in (self.adj[v], self.radj[v]):
+                    for u in us:
+                        if not u in seen:
+                            seen.add(u)
+                            order.append(u)
+        return order
+
+    def snap_positions(self, order, points, lo:Point, hi:Point):
+        # points are in the unit square. The box is hashed into at least 4n
+        # cells and every vertex takes the centre of its point's cell or, if
+        # that one is taken, of the nearest free cell, searched ring by ring.
+        n = len(order)
+        if n == 0:
+            return
+        w = max(hi.x - lo.x, 1)
+        h = max(hi.y - lo.y, 1)
+        cols = max(1, round(sqrt(4 * n * w / h)))
+        rows = max(1, -(-4 * n // cols))
+        taken = set()
+        for v, (x, y) in zip(order, points):
+            i = min(int(x * cols), cols - 1)
+            j = min(int(y * rows), rows - 1)
+            k = 0
+            while (i, j) in taken:
+                k += 1
+                ring = [(i + di, j + dj) for di in range(-k, k + 1) for dj in (-k, k)] + \
+                       [(i + di, j + dj) for di in (-k, k) for dj in range(-k + 1, k)]
+                free = [c for c in ring if 0 <= c[0] < cols and 0 <= c[1] < rows and not c in taken]
+                if len(free) > 0:
+                    i, j = min(free, key=lambda c: (c[0] - x * cols)**2 + (c[1] - y * rows)**2)
+            taken.add((i, j))
+            v.r = Point(lo.x + (i + 0.5) * w / cols, lo.y + (j + 0.5) * h / rows)
 
     def copy_vertexs(self):
         _V = set()
@@ -288,66 +1000,124 @@ class Graph:
             _V.add(v.copy())
         return _V
 
+    def view(self):
+        return GraphView(self)
+
+    # The graph without E or V, as a GraphView: only the vertexes at the
+    # removed edges are copied, with their adjacency rows.
+
     def remove_edges(self, E:set):
-        _G = self.copy()
+        _G = self.view()
         _G.remove_edges_update(E)
         return _G
-    
+
     def remove_nodes(self, V:set):
-        _G = self.copy()
+        _G = self.view()
         _G.remove_nodes_update(V)
         return _G
 
     def remove_edges_update(self, E:set):
-        self.is_coherent = None
-        self.delta = float('inf')
-        _E = set([self.find_edge(e.v, e.u, e.name, e.weighted, e.w) for e in E]).copy()
-        if self.ortype == EdgeOrType.UNORIENTED:
-            for e in E:
-                _E.add(self.find_edge(e.u, e.v, e.name, e.weighted, e.w))
-        for v in self.V:
-            for e in _E:
-                if v == e.v and v != e.u:
-                    v.degree -= 1
-        self.E.difference_update(_E)
-        self.m = len(self.E)
+        # One edge equal to each edge of E, as remove_edge.
+        for e in E:
+            self.remove_edge(e)
 
     def remove_nodes_update(self, V:set):
-        self.is_coherent = None
-        self.delta = float('inf')
-        _V = set()
-        _E = set()
         for v in V:
-            _V.add(self.find_vertex(v))
-            for e in self.E:
-                if v == e.u:
-                    _e = self.find_edge(e.v, e.u, e.name, e.weighted, e.w)
-                    _E.add(_e)
-                    _e.v.degree -= 1
-        self.V.difference_update(_V)
-        self.E.difference_update(_E)
+            self.remove_vertex(v)
+
+    # Single changes. Each one costs O(1) plus the parallel edges of the
+    # pair it touches; caches are dropped and rebuilt when next needed.
+
+    def add_vertex(self, name):
+        v = self.vertex(name)
         self.n = len(self.V)
-        self.m = len(self.M)
+        return v
 
+    def add_edge(self, v, u, w=0):
+        # v and u are vertexes or names; missing ones are created.
+        e = self.connect(self.vertex(v), self.vertex(u), w)
+        self.n = len(self.V)
+        self.m = len(self.E)
+        self.delta = float('inf')
+        return e
 
-    def coherent(self, v=None, marked=None):
-        if marked == None:
-            md = {v.index : False for v in self.V}
-        else:
-            md = marked
+    def remove_edge(self, e):
+        # Removes one edge equal to e, with its reverse in an unoriented graph.
+        e = self.find_edge(e.v, e.u, e.name, e.weighted, e.w)
+        if e is None:
+            return False
+        if self.ortype == EdgeOrType.UNORIENTED and e.v != e.u:
+            self.unindex_edge(self.find_edge(e.u, e.v, e.name, e.weighted, e.w))
+        self.unindex_edge(e)
+        # e's ends may be a GraphView's base vertexes, v and u are its own.
+        v = self.vertexes[e.v.name]
+        u = self.vertexes[e.u.name]
+        v.degree -= 1
+        if self.ortype == EdgeOrType.UNORIENTED:
+            u.degree -= 1
+        self.m = len(self.E)
+        self.delta = float('inf')
+        return True
+
+    def remove_vertex(self, v):
+        v = self.find_vertex(v)
         if v is None:
-            v = next(iter(self.V))
-            md[v.index] = True
-        for u in [e.u for e in self.E if v == e.v]:
-            if not md[u.index]:
-                md[u.index] = True
-                self.coherent(u, md)
-        if marked == None:
-            for v in md:
-                if md[v] == False:
-                    return False
-            return True
-        return None
+            return False
+        for index in (self.adj, self.radj):
+            for es in list(index[v].values()):
+                for e in list(es):
+                    self.remove_edge(e)
+        self.unindex_vertex(v)
+        self.n = len(self.V)
+        self.delta = float('inf')
+        return True
+
+    def edit(self, old, new, seed=None):
+        # Turns the graph built from the edge list rows old into the one of
+        # rows new with the fewest single changes; vertexes in both keep
+        # their positions and new ones are placed next to their neighbours.
+        added, removed, gone = diff_rows(old, new, self.ortype == EdgeOrType.ORIENTED)
+        for v, u, w in removed:
+            v, u = self.find_vertex(v), self.find_vertex(u)
+            if v is not None and u is not None:
+                self.remove_edge(Edge(v, u, weighted=self.wtype == EdgeWType.WEIGHTED, w=w))
+        for name in gone:
+            self.remove_vertex(name)
+        fresh = [name for name in row_names(new) if self.find_vertex(name) is None]
+        for name in fresh:
+            self.add_vertex(name)
+        for v, u, w in added:
+            self.add_edge(v, u, w)
+        self.place_vertexes([self.find_vertex(name) for name in fresh], seed)
+        return len(added) + len(removed) + len(gone) + len(fresh)
+
+    def place_vertexes(self, vs, seed=None):
+        # Each vertex goes next to the mean of its already placed neighbours,
+        # or anywhere in the box when it has none.
+        rng = Random(seed)
+        lo = Point(self.edges[0].x + 2*self.size, self.edges[0].y + 2*self.size)
+        hi = Point(self.edges[0].x + self.edges[1].x - 2*self.size, self.edges[0].y + self.edges[1].y - 2*self.size)
+        placed = set(self.V).difference(vs)
+        for v in vs:
+            us = [u for index in (self.adj, self.radj) for u in index[v] if u in placed]
+            if len(us) > 0:
+                r = Point(sum(u.r.x for u in us) / len(us), sum(u.r.y for u in us) / len(us))
+                r += Point(rng.uniform(-1, 1), rng.uniform(-1, 1)) * self.size
+            else:
+                r = Point(rng.uniform(lo.x, hi.x), rng.uniform(lo.y, hi.y))
+            v.r = r
+            v.v = Point()
+            placed.add(v)
+        if len(vs) > 0:
+            self.layout = None
+            self.spatial = None
+
+    def coherent(self, progress=None):
+        return self.connectivity.components_count(progress) <= 1
+
+    @property
+    def is_coherent(self):
+        return self.coherent()
 
     def cg(self) -> Point:
         r = Point()
@@ -355,89 +1125,200 @@ class Graph:
             r += v.r
         return r / len(self.V)
 
-    def update_positions(self, dt:float):
+    def layout_engine(self):
+        if self.layout is None:
+            try:
+                from layout import ForceLayout
+                self.layout = ForceLayout(self)
+            except ImportError:
+                self.layout = False
+        return self.layout
+
+    def set_vertex(self, v, r:Point=None, stable:bool=None):
+        # Moves v to r, stopping it, or pins or releases it, from outside the
+        # physics as when it is dragged. Only v's row of the layout engine and
+        # its grid cell are updated, nothing is rebuilt and the integrator is
+        # left as it is.
+        if r is not None:
+            old = v.r
+            v.r = Point(r.x, r.y)
+            v.v = Point()
+            if self.spatial is not None:
+                self.spatial.move(v, old, self.drawn_classes(v))
+        if stable is not None:
+            v.stable = stable
+        if self.layout:
+            self.layout.set_vertex(v)
+
+    def spatial_index(self):
+        if self.spatial is None:
+            self.spatial = SpatialGrid(self.V, max(2 * self.size, 1), self)
+        return self.spatial
+
+    def vertex_at(self, x:float, y:float, radius:float):
+        return self.spatial_index().nearest(x, y, radius)
+
+    def update_positions(self, dt:float=0.01) -> float:
+        # Returns the simulated time advanced. With an integrator its own dt
+        # is used instead of the given one, and nothing is done while asleep.
+        integrator = self.integrator
+        damping = 0
+        if integrator is not None:
+            if self.layout is None and integrator.wake_on_change:
+                integrator.wake()
+            if integrator.asleep:
+                return 0
+            dt = integrator.dt
+            damping = integrator.damping
+        engine = self.layout_engine()
+        if engine:
+            energy, shift = engine.step(dt, damping)
+        else:
+            energy, shift = self.step_positions(dt, damping)
+        if integrator is not None:
+            integrator.update(energy, shift, self.n)
+        self.spatial = None
+        return dt
+
+    def step_positions(self, dt:float, damping:float=0):
+        scale = self.scale
+        r = Point()
         for v in self.V:
-            v.a = Point(0, 0)
+            a = v.a.set(0, 0)
             for u in self.V:
                 if not u is v:
-                    r = v.r - u.r
-                    if abs(r.len() - self.scale) < 10:
-                        v.v += -r*Point.scalar(v.v, r)/r.len()**2
-                        v.a += -r*Point.scalar(v.a, r)/r.len()**2 * 0.7
-                    elif r.len() > self.scale:
-                        v.a += -r / (r.len() / self.scale)**3 / 10**3
+                    l2 = r.diff(v.r, u.r).len2()
+                    l = sqrt(l2)
+                    if abs(l - scale) < 10:
+                        v.v.axpy(-v.v.scalar(r) / l2, r)
+                        a.axpy(-a.scalar(r) / l2 * 0.7, r)
+                    elif l > scale:
+                        a.axpy(-(scale / l)**3 / 10**3, r)
                     else:
-                        v.a += r / (r.len() / self.scale)**3 / 10**3
+                        a.axpy((scale / l)**3 / 10**3, r)
 
-                    
+        shift = 0
+        energy = 0
         for v in self.V:
-            v.move(dt, self.edges, self.size)
+            shift = max(shift, v.move(dt, self.edges, self.size, damping))
+            if not v.stable:
+                energy += v.v.len2() / 2
+        return energy, sqrt(shift)
 
     def eq_classes(self):
-        eqc = []
-        for e in self.E:
-            placed = False
-            for X in eqc:
-                for x in X:
-                    if x is e:
-                        placed = True
-                        continue
-                if placed:
-                    break
-                if e == X[0]:
-                    X.append(e)
-                    placed = True
-                    break
-            if placed:
-                continue
-            else:
-                eqc.append([e])
-        return eqc
+        # Parallel edges are already grouped by the ordered (v, u) key of the
+        # adjacency index, which index_edge / unindex_edge keep up to date.
+        return [es for us in self.adj.values() for es in us.values()]
 
-    
+    def drawn_classes(self, v=None):
+        # The classes to draw, or only those at v: of an unoriented graph
+        # just the (v, u) class with v.name <= u.name, as the (u, v) one holds
+        # the same edges reversed.
+        oriented = self.ortype == EdgeOrType.ORIENTED
+        if v is None:
+            return [es for x, us in self.adj.items() for u, es in us.items() if oriented or x.name <= u.name]
+        classes = [es for u, es in self.adj[v].items() if oriented or v.name <= u.name]
+        return classes + [self.adj[u][v] for u in self.radj[v] if u is not v and (oriented or u.name < v.name)]
 
-    def eulers_way(self, vs=None):
-        if self.is_coherent == None and self.m > 0:
-            self.is_coherent = self.coherent()
-        if self.is_coherent and len([v for v in self.V if v.degree % 2 == 1]) != 2:
+    def euler_edges(self, progress=None):
+        # Integer view of the graph for Hierholzer: every undirected edge once,
+        # stored as the xor of its ends so the far end is ends[k] ^ v.
+        # progress(done, total) counts the arcs scanned.
+        vs = list(self.V)
+        idx = {v.name: i for i, v in enumerate(vs)}
+        out = [[] for v in vs]
+        ends = []
+        balance = [0] * len(vs)
+        oriented = self.ortype == EdgeOrType.ORIENTED
+        done = 0
+        for i, v in enumerate(vs):
+            us = self.adj[v]
+            if progress is not None:
+                done += sum(map(len, us.values()))
+                if i & 63 == 0:
+                    progress(done, len(self.E))
+            for u, es in us.items():
+                j = idx[u.name]
+                if oriented:
+                    balance[i] += len(es)
+                    balance[j] -= len(es)
+                elif i <= j:
+                    balance[i] += len(es)
+                    balance[j] += len(es)
+                else:
+                    continue
+                for e in es:
+                    out[i].append(len(ends))
+                    if not oriented and i != j:
+                        out[j].append(len(ends))
+                    ends.append(i ^ j)
+        return vs, out, ends, balance
+
+    def hierholzer(self, closed:bool, vs=None, progress=None):
+        # progress(done, total) is called now and then, counting the arcs
+        # scanned by euler_edges and then the steps of the walk, two per edge
+        # and one more; an exception raised by it aborts the search.
+        arcs = len(self.E)
+        edges = sum(v.degree for v in self.V) // (1 if self.ortype == EdgeOrType.ORIENTED else 2)
+        total = arcs + 2 * edges + 1
+        vertexes, out, ends, balance = self.euler_edges(phase_progress(progress, 0, total))
+        if len(ends) == 0:
             return []
+        if self.ortype == EdgeOrType.ORIENTED:
+            odd = [i for i, b in enumerate(balance) if b != 0]
+            starts = [i for i in odd if balance[i] == 1]
+            if len(odd) != (0 if closed else 2) or (not closed and len(starts) != 1):
+                return []
         else:
-            eulers_way = []
-            _G = self.copy()
-            st = list()
-            if vs is None:
-                for v in _G.V:
-                    if v.degree % 2 == 1:
-                        st.append(v)
-                        break
+            odd = [i for i, b in enumerate(balance) if b % 2 == 1]
+            starts = odd
+            if len(odd) != (0 if closed else 2):
+                return []
+        if closed:
+            starts = [i for i, es in enumerate(out) if len(es) > 0]
+        if vs is not None:
+            vs = self.find_vertex(vs)
+            starts = [i for i in starts if vertexes[i] is vs]
+            if len(starts) == 0:
+                return []
+
+        used = [False] * len(ends)
+        cursor = [0] * len(out)
+        st = [starts[0]]
+        way = []
+        k = 0
+        while len(st) > 0:
+            k += 1
+            if progress is not None and k & 4095 == 0:
+                progress(arcs + k, total)
+            v = st[-1]
+            es = out[v]
+            p = cursor[v]
+            while p < len(es) and used[es[p]]:
+                p += 1
+            if p == len(es):
+                cursor[v] = p
+                way.append(vertexes[v])
+                st.pop()
             else:
-                st.append(_G.find_vertex(vs))
-            while len(st) > 0:
-                v = st[-1]
-                if v.degree == 0:
-                    eulers_way.append(v)
-                    st.pop(-1)
-                else:
-                    for _e in _G.E:
-                        if v == _e.v:
-                            e = _e
-                            break
-                    st.append(e.u)
-                    _G.remove_edges_update(set([e]))   
-        return eulers_way
-
-    def eulers_cycle(self):
-        if self.is_coherent == None and self.m > 0:
-            self.is_coherent = self.coherent()
-        if self.is_coherent and len([v for v in self.V if v.degree % 2 == 1]) > 0:
+                used[es[p]] = True
+                cursor[v] = p + 1
+                st.append(ends[es[p]] ^ v)
+        if len(way) != len(ends) + 1:
             return []
-        else:
-            bridge = next(iter(self.E))
-            v = bridge.v
-            _G = self.remove_edges(set([bridge]))
-            eulers_cycle = _G.eulers_way(bridge.u)
-            eulers_cycle.append(v)
-        return eulers_cycle
+        way.reverse()
+        return way
+
+    def cached(self, algorithm:str, start=None):
+        # algorithm is the name of one of the searches below; the result is
+        # reused until the graph changes.
+        return results.get(self, algorithm, start)
+
+    def eulers_way(self, vs=None, progress=None):
+        return self.hierholzer(False, vs, progress)
+
+    def eulers_cycle(self, progress=None):
+        return self.hierholzer(True, progress=progress)
 
     def is_graph(self):
         for e in self.E:
@@ -448,45 +1329,214 @@ class Graph:
     def least_degree(self):
         return min([v.degree for v in self.V])
     
-    def is_gamiltons_graph(self):
-        if self.is_coherent is None:
-            self.is_coherent = self.coherent()
+    def is_gamiltons_graph(self, progress=None):
+        # The connectivity check, the only costly one, comes last.
+        if self.n < 3 or self.ortype != EdgeOrType.UNORIENTED:
+            return False
         if self.delta == float('inf'):
             self.delta = self.least_degree()
-        return self.ortype == EdgeOrType.UNORIENTED and self.is_coherent and self.n >= 3 and self.delta >= self.n / 2
+        return self.delta >= self.n / 2 and self.coherent(progress)
     
-    def gamils_cycle(self):
-        if not self.is_gamiltons_graph():
+    def adjacency_matrix(self, progress=None):
+        if self.matrix is None:
+            self.matrix = AdjacencyMatrix(self, progress)
+        return self.matrix
+
+    def hamilton_order(self, way:bool, progress=None):
+        # The rotation of the matrix's vertexes, with its virtual one for a
+        # way, or [] without Dirac's condition. progress counts the arcs the
+        # connectivity check and the matrix scan, unless they are cached, then
+        # the adjacent pairs of the rotation.
+        check = 0 if self.connectivity.valid else 2 * len(self.E)
+        build = 0 if self.matrix is not None else len(self.E)
+        n = self.n + way
+        total = check + build + n
+        if not self.is_gamiltons_graph(phase_progress(progress, 0, total)):
             return []
-        q = list(self.V)
-        for k in range(0, self.n * (self.n - 1)):
-            if self.find_edge(q[0], q[1]) is None:
-                i = 2
-                while self.find_edge(q[0], q[i]) is None or self.find_edge(q[1], q[i + 1]) is None:
-                    i += 1
-                j = 0
-                while 1 + j < i - j:
-                    q[1 + j], q[i - j] = q[i - j], q[1 + j]
-                    j += 1
-            q += [q[0]]
-            q = q[1:]
-        return [q[-1]] + q
-    
-    def gamils_way(self):
-        if not self.is_gamiltons_graph():
+        M = self.adjacency_matrix(phase_progress(progress, check, total))
+        return M.hamilton_cycle(n, phase_progress(progress, check + build, total))
+
+    def gamils_cycle(self, progress=None):
+        q = self.hamilton_order(False, progress)
+        return [self.matrix.vertexes[i] for i in q]
+
+    def gamils_way(self, progress=None):
+        q = self.hamilton_order(True, progress)[:-1]
+        if len(q) == 0:
             return []
-        _G = self.copy()
-        v = Vertex('R')
-        for u in _G.V:
-            _G.E.update([Edge(v, u), Edge(u, v)])
-        v.degree = _G.n
-        _G.V.add(v)
-        q = _G.gamils_cycle()[1:]
-        i = 0
-        while q[i] != v:
-            i += 1
-        q = q[i+1:] + q[:i]
-        return q
-                
+        M = self.matrix
+        i = q.index(M.n)
+        return [M.vertexes[i] for i in q[i+1:] + q[:i]]
+
+
+class MapOverlay(MutableMapping):
+    # A dict read through to a base mapping, which must not change meanwhile:
+    # keys set here shadow the base's and deleted ones hide them.
+
+    def __init__(self, base):
+        self.base = base
+        self.own = {}
+        self.gone = set()
+        self.size = len(base)
+
+    def __getitem__(self, k):
+        if k in self.own:
+            return self.own[k]
+        if k in self.gone:
+            raise KeyError(k)
+        return self.base[k]
+
+    def __setitem__(self, k, x):
+        if not k in self:
+            self.size += 1
+        self.own[k] = x
+        self.gone.discard(k)
+
+    def __delitem__(self, k):
+        if not k in self:
+            raise KeyError(k)
+        self.own.pop(k, None)
+        if k in self.base:
+            self.gone.add(k)
+        self.size -= 1
+
+    def __contains__(self, k):
+        return k in self.own or (not k in self.gone and k in self.base)
+
+    def __iter__(self):
+        for k in self.base:
+            if not k in self.gone:
+                yield k
+        for k in self.own:
+            if not k in self.base:
+                yield k
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.own.clear()
+        self.gone = set(self.base)
+        self.size = 0
+
+class SetOverlay(MutableSet):
+    # The same for a set of objects hashed by identity, such as edges.
+
+    def __init__(self, base):
+        self.base = base
+        self.hidden = set()
+        self.extra = set()
+
+    def __contains__(self, x):
+        return x in self.extra or (not x in self.hidden and x in self.base)
+
+    def __iter__(self):
+        for x in self.base:
+            if not x in self.hidden:
+                yield x
+        yield from self.extra
+
+    def __len__(self):
+        return len(self.base) - len(self.hidden) + len(self.extra)
+
+    def add(self, x):
+        if x in self.hidden:
+            self.hidden.discard(x)
+        elif not x in self.base:
+            self.extra.add(x)
+
+    def discard(self, x):
+        if x in self.extra:
+            self.extra.discard(x)
+        elif x in self.base:
+            self.hidden.add(x)
+
+    def clear(self):
+        self.hidden = set(self.base)
+        self.extra.clear()
+
+class VertexSet(Set):
+    # The vertexes of a name -> vertex mapping, as a set; clear() empties
+    # the mapping.
+
+    def __init__(self, vertexes):
+        self.vertexes = vertexes
+
+    def __contains__(self, v):
+        return isinstance(v, Vertex) and v.name in self.vertexes
+
+    def __iter__(self):
+        return iter(self.vertexes.values())
+
+    def __len__(self):
+        return len(self.vertexes)
+
+    def clear(self):
+        self.vertexes.clear()
+
+class GraphView(Graph):
+    # A Graph made from another one, its base, that copies only what its
+    # changes touch: a vertex gets its own copy, with copies of its adjacency
+    # rows, when one of its edges is added or removed, and everything else is
+    # read from the base, which must not change while the view is in use.
+    # Vertexes the view has not changed are the base's own objects, positions
+    # included; copy() gives an independent Graph.
+
+    def __init__(self, base):
+        Graph.__init__(self, [], InputType.NO_INPUT, wtype=base.wtype, ortype=base.ortype,
+                       scale=base.scale, size=base.size, edges=base.edges)
+        self.base = base
+        self.vertexes = MapOverlay(base.vertexes)
+        self.adj = MapOverlay(base.adj)
+        self.radj = MapOverlay(base.radj)
+        self.V = VertexSet(self.vertexes)
+        self.E = SetOverlay(base.E)
+        self.n = base.n
+        self.m = base.m
+        self.theta = base.theta
+        self.delta = base.delta
+
+    def own(self, v):
+        # The view's own copy of v, sharing its position.
+        x = self.vertexes.own.get(v.name)
+        if x is None:
+            v = self.vertexes[v.name]
+            x = Vertex(v.name, v.R, v.stable, v.degree, color=v.color)
+            x.r, x.v, x.a = v.r, v.v, v.a
+            self.vertexes[x.name] = x
+            for index in (self.adj, self.radj):
+                index[x] = {u: list(es) for u, es in index[v].items()}
+        return x
+
+    def index_vertex(self, v):
+        self.version += 1
+        self.vertexes[v.name] = v
+        self.adj[v] = {}
+        self.radj[v] = {}
+        self.layout = None
+        self.matrix = None
+        self.spatial = None
+        self.connectivity.add_vertex(v)
+
+    def unindex_vertex(self, v):
+        self.version += 1
+        del self.vertexes[v.name]
+        del self.adj[v]
+        del self.radj[v]
+        self.layout = None
+        self.matrix = None
+        self.spatial = None
+        self.connectivity.invalidate()
+
+    def connect(self, v, u, w=0):
+        return Graph.connect(self, self.own(v), self.own(u), w)
 
+    def index_edge(self, e):
+        self.own(e.v)
+        self.own(e.u)
+        Graph.index_edge(self, e)
 
+    def unindex_edge(self, e):
+        self.own(e.v)
+        self.own(e.u)
+        Graph.unindex_edge(self, e)
@@ -0,0 +1,393 @@
+
+import numpy as np
+
+class ForceLayout:
+    # Same physics as the pure python Graph.step_positions, but positions,
+    # velocities and accelerations live in contiguous (n, 2) float arrays and
+    # pairwise forces are evaluated block by block.
+
+    block_size: int = 1 << 18
+    exact_limit: int = 1000
+    leaf_size: int = 8
+
+    def __init__(self, G, r=None, scale:float=None):
+        # Given r, lays out bare points in G's box instead of G's vertexes.
+        # A scale other than G's shrinks the whole physics with it: the scale
+        # band and the speed limit, so that motion keeps the same time scale.
+        # A cleared graph has scale 0 and keeps the unscaled band and limit.
+        self.G = G
+        self.scale = G.scale if scale is None else scale
+        ratio = self.scale / G.scale if G.scale != 0 else 1
+        self.band_width = 10 * ratio
+        self.max_speed = 200 * ratio
+        self.vertexes = list(G.V) if r is None else []
+        self.index = {v: i for i, v in enumerate(self.vertexes)}
+        self.n = len(self.vertexes) if r is None else len(r)
+        self.r = np.zeros((self.n, 2))
+        self.v = np.zeros((self.n, 2))
+        self.a = np.zeros((self.n, 2))
+        self.stable = np.zeros(self.n, dtype=bool)
+        if r is None:
+            self.pull()
+        else:
+            self.r[:] = r
+
+    def pull(self):
+        for i, v in enumerate(self.vertexes):
+            self.r[i] = (v.r.x, v.r.y)
+            self.v[i] = (v.v.x, v.v.y)
+            self.a[i] = (v.a.x, v.a.y)
+            self.stable[i] = v.stable
+
+    def set_vertex(self, v):
+        i = self.index.get(v)
+        if i is not None:
+            self.r[i] = (v.r.x, v.r.y)
+            self.v[i] = (v.v.x, v.v.y)
+            self.stable[i] = v.stable
+
+    def sync(self):
+        for v, r, _v, a in zip(self.vertexes, self.r.tolist(), self.v.tolist(), self.a.tolist()):
+            v.r.x, v.r.y = r
+            v.v.x, v.v.y = _v
+            v.a.x, v.a.y = a
+
+    def forces(self):
+        scale = self.scale
+        x = self.r[:, 0]
+        y = self.r[:, 1]
+        rows = max(1, self.block_size // max(self.n, 1))
+        for s in range(0, self.n, rows):
+            t = min(s + rows, self.n)
+            dx = x[s:t, None] - x[None, :]
+            dy = y[s:t, None] - y[None, :]
+            l2 = dx * dx
+            l2 += dy * dy
+            l2[np.arange(t - s), np.arange(s, t)] = np.inf
+            l2[l2 == 0] = np.inf
+            l = np.sqrt(l2)
+            w = scale - l
+            band = np.abs(w) < self.band_width
+            c = np.sign(w)
+            c[band] = 0
+            l2 *= l
+            c /= l2
+            c *= scale**3 / 10**3
+            a = np.stack((np.einsum('ij,ij->i', c, dx), np.einsum('ij,ij->i', c, dy)), axis=1)
+            i, j = np.nonzero(band)
+            if len(i) > 0:
+                self.band(a, i, np.stack((dx[i, j], dy[i, j]), axis=1) / l[i, j, None], s)
+            self.a[s:t] = a
+
+    def band(self, a, i, d, s=0):
+        # The projections of a vertex are averaged: summed from the same
+        # velocity they would overshoot when it has several band neighbours,
+        # where the pure python loop applies them one after the other.
+        k = np.maximum(np.bincount(i, minlength=len(a)), 1)[:, None]
+        dv = np.zeros_like(a)
+        np.add.at(dv, i, d * np.einsum('ij,ij->i', d, self.v[s + i])[:, None])
+        self.v[s:s + len(a)] -= dv / k
+        da = np.zeros_like(a)
+        np.add.at(da, i, d * np.einsum('ij,ij->i', d, a[i])[:, None])
+        a -= da * (0.7 / k)
+
+    def forces_barnes_hut(self, theta:float):
+        # The near pairs come from the tree in blocks, and a vertex's band
+        # pairs may be spread over several of them. As band() projects the
+        # final acceleration, the blocks only sum up the band pair count and
+        # the d d^T products (xx, xy, yy) per vertex, applied once at the end.
+        scale = self.scale
+        n = self.n
+        tree = QuadTree(self.r, self.leaf_size)
+        a = np.zeros((n, 2))
+        k = np.zeros(n)
+        p = np.zeros((n, 3))
+        for i, j in tree.forces(a, scale, theta, self.band_width, self.block_size):
+            d = tree.r[i] - tree.r[j]
+            l = np.hypot(d[:, 0], d[:, 1])
+            d = d[l > 0]
+            i = i[l > 0]
+            l = l[l > 0]
+            w = scale - l
+            band = np.abs(w) < self.band_width
+            c = np.sign(w) * scale**3 / 10**3 / l**3
+            c[band] = 0
+            a[:, 0] += np.bincount(i, c * d[:, 0], n)
+            a[:, 1] += np.bincount(i, c * d[:, 1], n)
+            if band.any():
+                i = i[band]
+                d = d[band] / l[band, None]
+                k += np.bincount(i, minlength=n)
+                p[:, 0] += np.bincount(i, d[:, 0] * d[:, 0], n)
+                p[:, 1] += np.bincount(i, d[:, 0] * d[:, 1], n)
+                p[:, 2] += np.bincount(i, d[:, 1] * d[:, 1], n)
+        a = a[tree.rank]
+        k = np.maximum(k[tree.rank], 1)[:, None]
+        p = p[tree.rank]
+        v = self.v
+        v -= np.stack((p[:, 0] * v[:, 0] + p[:, 1] * v[:, 1], p[:, 1] * v[:, 0] + p[:, 2] * v[:, 1]), axis=1) / k
+        a -= np.stack((p[:, 0] * a[:, 0] + p[:, 1] * a[:, 1], p[:, 1] * a[:, 0] + p[:, 2] * a[:, 1]), axis=1) * (0.7 / k)
+        self.a[:] = a
+
+    def move(self, dt:float, damping:float=0):
+        # Returns the kinetic energy of the moving vertexes and the longest
+        # step one of them made.
+        edges = self.G.edges
+        size = self.G.size
+        lo = np.array((edges[0].x, edges[0].y))
+        hi = np.array((edges[1].x + edges[0].x, edges[1].y + edges[0].y))
+        free = ~self.stable
+        r = self.r[free]
+        v = self.v[free]
+        a = self.a[free]
+        gap_lo = r - lo - size
+        gap_hi = hi - size - r
+        flip = ((0 < gap_lo) & (gap_lo < 20) & (v < 0)) | ((0 < gap_hi) & (gap_hi < 20) & (v > 0))
+        v[flip] *= -1
+        d = v * dt + a * dt**2 / 2
+        r += d
+        v += a * dt
+        if damping:
+            v *= max(0.0, 1 - damping * dt)
+        speed = np.hypot(v[:, 0], v[:, 1])
+        fast = speed > self.max_speed
+        v[fast] *= (self.max_speed / speed[fast])[:, None]
+        self.r[free] = r
+        self.v[free] = v
+        if len(d) == 0:
+            return 0.0, 0.0
+        return float((v * v).sum() / 2), float(np.sqrt((d * d).sum(axis=1).max()))
+
+    def step(self, dt:float, damping:float=0):
+        theta = self.G.theta
+        if theta is not None and self.n > self.exact_limit:
+            self.forces_barnes_hut(theta)
+        elif self.n > 1:
+            self.forces()
+        result = self.move(dt, damping)
+        self.sync()
+        return result
+
+    def settle(self, steps:int, dt:float, theta:float=1):
+        # Heavily damped steps on the arrays alone, with Barnes-Hut above
+        # exact_limit whether or not G.theta is set.
+        for k in range(steps):
+            if self.n > self.exact_limit:
+                self.forces_barnes_hut(theta)
+            elif self.n > 1:
+                self.forces()
+            self.move(dt, 0.5 / dt)
+        return self.r
+
+
+def edge_arrays(G, vertexes):
+    # Both directions of every edge between different vertexes, as indexes
+    # into vertexes, with a unit weight per parallel edge.
+    index = {v: i for i, v in enumerate(vertexes)}
+    ev = []
+    eu = []
+    for v, us in G.adj.items():
+        i = index[v]
+        for u, es in us.items():
+            j = index[u]
+            if i != j:
+                ev.extend([i] * len(es))
+                eu.extend([j] * len(es))
+    ev, eu = np.array(ev + eu, dtype=np.int64), np.array(eu + ev, dtype=np.int64)
+    return ev, eu, np.ones(len(ev))
+
+def spectral_points(n:int, ev, eu, w, seed=None, rounds:int=200):
+    # Second and third eigenvectors of the weighted graph Laplacian L, by
+    # orthogonal iteration on c*I - L with the constant vector projected out.
+    # Each round is O(n + m).
+    degree = np.bincount(ev, w, minlength=n)
+    c = 2 * degree.max() + 1 if n > 0 else 1
+    x = np.random.default_rng(seed).standard_normal((n, 2))
+    for k in range(rounds if len(ev) > 0 else 0):
+        x -= x.mean(axis=0)
+        y = (c - degree)[:, None] * x
+        y[:, 0] += np.bincount(ev, w * x[eu, 0], n)
+        y[:, 1] += np.bincount(ev, w * x[eu, 1], n)
+        x = np.linalg.qr(y)[0]
+    # Eigenvectors of sparse graphs pile up near zero; ranks keep the order
+    # along each axis but spread the vertexes evenly over the unit square.
+    x = np.argsort(np.argsort(x, axis=0, kind='stable'), axis=0) + 0.5
+    return x / max(n, 1)
+
+def spectral_positions(G, vertexes, seed=None, rounds:int=200):
+    return spectral_points(len(vertexes), *edge_arrays(G, vertexes), seed, rounds).tolist()
+
+def heaviest(n:int, ev, eu, score):
+    # The neighbour of every vertex along its best scored edge, -1 if none.
+    best = np.lexsort((score, ev))
+    last = np.ones(len(best), dtype=bool)
+    last[:-1] = ev[best[1:]] != ev[best[:-1]]
+    pick = np.full(n, -1, dtype=np.int64)
+    pick[ev[best[last]]] = eu[best[last]]
+    return pick
+
+def match(n:int, ev, eu, w, size, rng, rounds:int=4):
+    # Handshake heavy edge matching: every vertex points at the neighbour
+    # with the heaviest edge relative to both sizes, ties broken at random,
+    # and mutual pointers are merged. Vertexes left over join the group of
+    # their heaviest matched neighbour, or else are paired up in any order.
+    # Returns the coarse vertex of every vertex and the coarse vertex count.
+    mate = np.full(n, -1, dtype=np.int64)
+    score = w / (size[ev] * size[eu]) * (1 + 1e-3 * rng.random(len(ev)))
+    for k in range(rounds):
+        free = (mate[ev] < 0) & (mate[eu] < 0)
+        if not free.any():
+            break
+        pick = heaviest(n, ev[free], eu[free], score[free])
+        i = np.nonzero(pick >= 0)[0]
+        i = i[pick[pick[i]] == i]
+        mate[i] = pick[i]
+    matched = mate >= 0
+    lead = matched & (np.arange(n) < mate)
+    parent = np.full(n, -1, dtype=np.int64)
+    parent[lead] = np.arange(lead.sum())
+    parent[matched & ~lead] = parent[mate[matched & ~lead]]
+    heavy = heaviest(n, ev, eu, score)
+    join = ~matched & (heavy >= 0)
+    join[join] = matched[heavy[join]]
+    parent[join] = parent[heavy[join]]
+    rest = np.nonzero(parent < 0)[0]
+    m = int(lead.sum())
+    parent[rest] = m + np.arange(len(rest)) // 2
+    return parent, m + (len(rest) + 1) // 2
+
+def coarsen(n:int, ev, eu, w, parent, m:int):
+    # Edges of the coarse graph, parallel ones merged into one with the sum
+    # of their weights, edges inside a coarse vertex dropped.
+    cv, cu = parent[ev], parent[eu]
+    keep = cv != cu
+    key, inverse = np.unique(cv[keep] * m + cu[keep], return_inverse=True)
+    return key // m, key % m, np.bincount(inverse, w[keep])
+
+def multilevel_positions(G, vertexes, lo, hi, seed=None, coarsest:int=100, steps:int=10, dt:float=0.2):
+    # Coarsen by matching until at most coarsest vertexes are left, place the
+    # coarsest level spectrally, then go back up: every vertex starts next to
+    # its coarse vertex and each level is refined by a few physics steps at a
+    # scale of twice its mean spacing, which keeps the Barnes-Hut near field
+    # small. Levels above exact_limit get fewer steps, down to 2, as their
+    # coarse vertex already placed them well. Returns an (n, 2) array.
+    rng = np.random.default_rng(seed)
+    n = len(vertexes)
+    if n == 0:
+        return np.zeros((0, 2))
+    ev, eu, w = edge_arrays(G, vertexes)
+    size = np.ones(n)
+    levels = []
+    while n > coarsest:
+        parent, m = match(n, ev, eu, w, size, rng)
+        levels.append((n, parent))
+        ev, eu, w = coarsen(n, ev, eu, w, parent, m)
+        size = np.bincount(parent, size, m)
+        n = m
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    area = np.prod(hi - lo)
+    r = lo + spectral_points(n, ev, eu, w, rng.integers(1 << 32)) * (hi - lo)
+    r = ForceLayout(G, r, min(G.scale, 2 * np.sqrt(area / n))).settle(steps, dt)
+    for n, parent in reversed(levels):
+        spacing = np.sqrt(area / n)
+        r = np.clip(np.clip(r, lo, hi)[parent], lo + spacing / 2, hi - spacing / 2)
+        r += rng.uniform(-spacing / 2, spacing / 2, (n, 2))
+        k = max(2, min(steps, steps * ForceLayout.exact_limit // n))
+        r = ForceLayout(G, r, min(G.scale, 2 * spacing)).settle(k, dt)
+    return np.clip(r, lo, hi)
+
+def spread_bits(x):
+    x = (x | (x << 8)) & 0x00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F
+    x = (x | (x << 2)) & 0x33333333
+    x = (x | (x << 1)) & 0x55555555
+    return x
+
+class QuadTree:
+    # Bodies are sorted along a Morton curve, so every cell of every level
+    # covers a contiguous run of them and the tree is just, per level, the
+    # sorted cell keys with the start, count and centre of mass of each run.
+
+    depth: int = 16
+
+    def __init__(self, r, leaf_size:int=8):
+        lo = r.min(axis=0)
+        self.side = max(float((r.max(axis=0) - lo).max()), 1e-9) * (1 + 1e-9)
+        cells = ((r - lo) / self.side * (1 << self.depth)).astype(np.int64)
+        np.clip(cells, 0, (1 << self.depth) - 1, out=cells)
+        code = spread_bits(cells[:, 0]) | (spread_bits(cells[:, 1]) << 1)
+        self.order = np.argsort(code, kind='stable')
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(r))
+        self.code = code[self.order]
+        self.r = r[self.order]
+        self.leaf_size = leaf_size
+        self.levels = []
+        for k in range(self.depth + 1):
+            shift = 2 * (self.depth - k)
+            keys = self.code >> shift
+            start = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            count = np.diff(np.r_[start, len(keys)])
+            com = np.add.reduceat(self.r, start, axis=0) / count[:, None]
+            self.levels.append((keys[start], start, count, com, shift))
+            if count.max() <= leaf_size:
+                break
+
+    def forces(self, a, scale:float, theta:float, band:float=10, block_size:int=1 << 18):
+        # Far field cells that lie entirely on one side of the scale band are
+        # folded into a; the remaining (i, j) body pairs are yielded in blocks
+        # of about block_size for the exact pairwise rule. The (body, cell)
+        # pairs still open are walked down level by level in runs small enough
+        # that a run's leaf pairs fit in a block, so that memory stays bounded
+        # even when the band keeps every cell open.
+        n = len(self.r)
+        last = len(self.levels) - 1
+        run = max(1, block_size // self.leaf_size)
+        stack = [(0, np.arange(n), np.zeros(n, dtype=np.int64))]
+        pi = []
+        pj = []
+        pairs = 0
+        while len(stack) > 0:
+            k, b, c = stack.pop()
+            if len(b) > run:
+                stack.append((k, b[run:], c[run:]))
+                stack.append((k, b[:run], c[:run]))
+                continue
+            keys, start, count, com, shift = self.levels[k]
+            side = self.side / (1 << k)
+            d = self.r[b] - com[c]
+            l = np.hypot(d[:, 0], d[:, 1])
+            reach = side * 1.4143
+            far = (side < theta * l) & ((self.code[b] >> shift) != keys[c]) & \
+                  ((l - reach > scale + band) | (l + reach < scale - band))
+            if far.any():
+                f = np.sign(scale - l[far]) * count[c[far]] * scale**3 / 10**3 / l[far]**3
+                np.add.at(a, b[far], d[far] * f[:, None])
+            b = b[~far]
+            c = c[~far]
+            leaf = (count[c] <= self.leaf_size) | (k == last)
+            i, j = expand(b[leaf], start[c[leaf]], start[c[leaf]] + count[c[leaf]])
+            pi.append(i[i != j])
+            pj.append(j[i != j])
+            pairs += len(pi[-1])
+            if pairs >= block_size:
+                yield np.concatenate(pi), np.concatenate(pj)
+                pi = []
+                pj = []
+                pairs = 0
+            b = b[~leaf]
+            c = c[~leaf]
+            if len(b) > 0:
+                children = self.levels[k + 1][0]
+                b, c = expand(b, np.searchsorted(children, keys[c] << 2), np.searchsorted(children, (keys[c] + 1) << 2))
+                stack.append((k + 1, b, c))
+        if pairs > 0:
+            yield np.concatenate(pi), np.concatenate(pj)
+
+def expand(b, lo, hi):
+    # Pairs every b[k] with each index in lo[k] .. hi[k] - 1.
+    count = hi - lo
+    b = np.repeat(b, count)
+    offset = np.repeat(lo - np.cumsum(count) + count, count)
+    return b, offset + np.arange(len(b))
@@ -0,0 +1,123 @@
+
+import os
+import json
+import time
+import cProfile
+from collections import deque
+
+class FrameProfiler:
+    # Wall time of the phases of a frame loop and per frame counters. The
+    # loop calls frame() once per frame and phase(name) where each phase
+    # starts, a phase lasting until the next one begins, so the cost is one
+    # clock read per phase. The last `window` frames are kept for averages;
+    # with trace on every phase, counter set and span is also kept as a
+    # Chrome trace event (chrome://tracing, ui.perfetto.dev) until export().
+
+    def __init__(self, window:int=120, trace:bool=False, limit:int=1000000):
+        self.window = window
+        self.trace = trace
+        self.limit = limit
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.frames = deque(maxlen=window)
+        self.events = []
+        self.threads = {'main': 0}
+        self.phases = {}
+        self.counters = {}
+        self.current = None
+        self.started = self.origin
+        self.frame_start = None
+
+    def micros(self, t:float) -> float:
+        return (t - self.origin) * 1e6
+
+    def record(self, event:dict):
+        if len(self.events) < self.limit:
+            event['pid'] = self.pid
+            event['tid'] = self.threads.setdefault(event['tid'], len(self.threads))
+            self.events.append(event)
+
+    def close_phase(self, now:float):
+        if self.current is None:
+            return
+        self.phases[self.current] = self.phases.get(self.current, 0.0) + now - self.started
+        if self.trace:
+            self.record({'name': self.current, 'cat': 'frame', 'ph': 'X', 'tid': 'main',
+                         'ts': self.micros(self.started), 'dur': (now - self.started) * 1e6})
+        self.current = None
+
+    def phase(self, name:str):
+        now = time.perf_counter()
+        self.close_phase(now)
+        self.current = name
+        self.started = now
+
+    def count(self, name:str, n:int=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def frame(self):
+        # Ends the frame in progress, if any, and starts the next one.
+        now = time.perf_counter()
+        self.close_phase(now)
+        if self.frame_start is not None:
+            self.frames.append((now - self.frame_start, self.phases, self.counters))
+            if self.trace and len(self.counters) > 0:
+                self.record({'name': 'counters', 'ph': 'C', 'tid': 'main', 'ts': self.micros(now),
+                             'args': self.counters})
+        self.phases = {}
+        self.counters = {}
+        self.frame_start = now
+
+    def span(self, name:str, start:float, end:float, thread:str='worker', args:dict=None):
+        # A piece of work timed elsewhere, e.g. on another thread, with
+        # perf_counter() start and end times.
+        if self.trace:
+            self.record({'name': name, 'cat': 'work', 'ph': 'X', 'tid': thread, 'ts': self.micros(start),
+                         'dur': (end - start) * 1e6, 'args': args or {}})
+
+    def summary(self) -> dict:
+        # Averages per frame over the window: 'frame' and each phase in
+        # seconds, then each counter.
+        n = len(self.frames)
+        if n == 0:
+            return {}
+        phases = {'frame': sum(f[0] for f in self.frames) / n}
+        counters = {}
+        for _, ps, cs in self.frames:
+            for name, t in ps.items():
+                phases[name] = phases.get(name, 0.0) + t / n
+            for name, c in cs.items():
+                counters[name] = counters.get(name, 0) + c / n
+        return {'phases': phases, 'counters': counters}
+
+    def lines(self) -> list:
+        s = self.summary()
+        if len(s) == 0:
+            return []
+        frame = s['phases'].pop('frame')
+        lines = ['%.1f fps  %.2f ms/frame' % (1 / frame if frame > 0 else 0, frame * 1000)]
+        for name, t in sorted(s['phases'].items(), key=lambda p: -p[1]):
+            lines.append('%-10s %6.2f ms' % (name, t * 1000))
+        for name, c in sorted(s['counters'].items()):
+            lines.append('%-10s %8.1f' % (name, c))
+        return lines
+
+    def export(self, path:str):
+        with open(path, 'w') as f:
+            names = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                     for name, tid in self.threads.items()]
+            json.dump({'traceEvents': names + self.events, 'displayTimeUnit': 'ms'}, f)
+
+def profile_session(path:str):
+    # A running cProfile.Profile for a session whose stats go to path, or
+    # None without a path. cProfile only sees the thread that started it.
+    if not path:
+        return None
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+def end_session(profile, path:str):
+    if profile is not None:
+        profile.disable()
+        profile.dump_stats(path)
@@ -1,105 +1,12 @@
+import os
+import sys
 import pygame
 from pygame.locals import * 
 from graph import *
-from math import pi, tan, atan, cos, sin, exp
-
-def draw_node(screen, color, pos, size, name='',borderline=2):
-    pygame.draw.circle(screen, (0, 0, 0), pos, size+borderline)
-    pygame.draw.circle(screen, color, pos, size)
-
-    if name != '':
-        font = pygame.font.SysFont('freesansbold.ttf', size)    
-        img = font.render(name, True,
-                          pygame.Color((0, 0, 0)),
-                          pygame.Color((255, 255, 255)))
-        screen.blit(img, (pos[0] - img.get_width() / 2,
-                          pos[1] - img.get_height() / 2))
-
-def polar_angle(x, y):
-    if x == 0:
-        if y < 0:
-            return 3/2*pi
-        if y > 0:
-            return pi/2
-    if y == 0:
-        if x < 0:
-            return pi
-        if x > 0:
-            return 0
-    if y < 0 and x > 0:
-        gamma = atan(abs(y / x))
-    elif y < 0 and x < 0:
-        gamma = pi - atan(abs(y / x))
-    elif y > 0 and x < 0:
-        gamma = 3/2*pi - atan(abs(x / y))
-    elif y > 0 and x > 0:
-        gamma = 2 * pi - atan(abs(y / x))
-    return gamma
-
-def draw_loop(screen, color, v, scale, pc, n):
-    alpha = 2 * pi / n
-    l = 0
-    r = scale / 10
-    dy = 2*r / pc
-    k = 0
-    while k < n: 
-        gamma = alpha * k + pi
-        l = 0
-        p = [[v.r.x, v.r.y]]
-        _p = [[v.r.x, v.r.y]]
-        while l <= pc:
-            y = l * dy
-            x = (r**2 - (y - r)**2)**(1/2)
-            p.append([v.r.x + cos(gamma) * x + sin(gamma) * y, v.r.y - sin(gamma) * x + cos(gamma) * y])
-            _p.append([v.r.x + cos(gamma) * (-x) + sin(gamma) * y, v.r.y - sin(gamma) * (-x) + cos(gamma) * y])
-            l += 1
-        pygame.draw.lines(screen, color, False, p, 2)
-        pygame.draw.lines(screen, color, False, _p, 2)
-        k += 1
-
-def draw_arc(screen, color, v, u, scale, pc, n):
-    _n = n - (n % 2)
-    r = u.r - v.r
-    alpha = atan(scale / r.len()) * 2/6
-    gamma = polar_angle(r.x, r.y)
-    a = r.len() / 2
-    dx = r.len() / pc
-    b0 = a * tan(alpha)
-    d = 2 * b0 / _n
-    k = 0
-    b = b0 - d * k
-    while k < _n / 2:
-        l = 1
-        p = [[v.r.x, v.r.y]]
-        _p = [[v.r.x, v.r.y]]
-        while l < pc:
-            x = l * dx
-            y = b * (1 - (x / a - 1)**2)**(1/2)
-            p.append([v.r.x + cos(gamma) * x + sin(gamma) * y, v.r.y - sin(gamma) * x + cos(gamma) * y])
-            _p.append([v.r.x + cos(gamma) * x + sin(gamma) * (-y), v.r.y - sin(gamma) * x + cos(gamma) * (-y)])
-            l += 1
-        p.append([u.r.x, u.r.y])
-        _p.append([u.r.x, u.r.y])
-        pygame.draw.lines(screen, color, False, p, 2)
-        pygame.draw.lines(screen, color, False, _p, 2)
-        k += 1
-        b = b0 - d * k
-
-def draw_edge(screen, edges, scale, pc=10):
-    if len(edges) == 0:
-        return
-    e = next(iter(edges))
-    v = e.v
-    u = e.u
-    n = len(edges)
-    if v == u:
-        draw_loop(screen, e.color, v, scale, 2*pc, n)
-    else:
-        if n % 2 == 1:
-            pygame.draw.aaline(screen, e.color, v.pos(), u.pos())
-        if n > 1:
-            draw_arc(screen, e.color, v, u, scale, pc, n)
-
+from drawing import *
+from stream import load_edge_list
+from executor import Executor
+from profiler import FrameProfiler, profile_session, end_session
 
 def is_valid_edges_input(texts):
     for text in texts:
@@ -108,6 +15,15 @@ def is_valid_edges_input(texts):
             return False
     return True
 
+def edge_rows(G):
+    rows = []
+    for es in G.eq_classes():
+        v = es[0].v
+        u = es[0].u
+        if G.ortype == EdgeOrType.ORIENTED or v.name <= u.name:
+            rows += [[v.name, u.name]] * len(es)
+    return rows + [[v.name] for v in G.V if len(G.adj[v]) == 0 and len(G.radj[v]) == 0]
+
 def show_way(way, G, alg_count, last_edge, to_show):
     if alg_count == len(way):
         last_edge.v.color = (255, 255, 255)
@@ -129,6 +45,34 @@ def show_way(way, G, alg_count, last_edge, to_show):
         alg_count += 1
     return way, alg_count, last_edge, to_show
 
+LARGE_GRAPH = 1000
+
+def place(G, fresh:bool=True):
+    # Large graphs get the multilevel layout and are left still, edits and
+    # drags included, as a physics step of theirs takes longer than a frame.
+    large = G.n > LARGE_GRAPH
+    if fresh:
+        G.generate_positions(G.edges, 'multilevel' if large else 'circle')
+    G.integrator = Integrator(wake_on_change=not large)
+    if large:
+        G.theta = 1.0
+        G.layout_engine()
+        G.integrator.asleep = True
+
+def relax(G):
+    # After a drag small graphs settle again around the vertex, large ones
+    # stay as they are.
+    if G.integrator.wake_on_change:
+        G.integrator.wake()
+
+def way_label(algorithm:str, way) -> str:
+    # At most WAY_LABEL characters of the way, followed by its length when
+    # cut, so a long one does not turn into a huge surface.
+    text = ('Cycle: ' if algorithm.endswith('cycle') else 'Chain: ') + str(way[:WAY_LABEL])
+    if len(text) > WAY_LABEL:
+        text = text[:WAY_LABEL] + '... (%d vertexes)' % len(way)
+    return text
+
 # Window settings
 WIDTH  = 1000
 HEIGHT = 800
@@ -155,16 +99,28 @@ li = [
     ['E', 'C']
 ]
 
-G = Graph(li, InputType.EDGE_LIST, scale=300, size=30, edges=graph_edges)
-
-G.generate_positions(graph_edges)
-
-edge_eqc = G.eq_classes()
+# A graph file given on the command line replaces the example: snapshots
+# (.snap) reopen with their layout, edge lists get fresh positions.
+graph_path = sys.argv[1] if len(sys.argv) > 1 else None
+snapshot_path = graph_path if graph_path is not None and graph_path.endswith('.snap') else 'graph.snap'
+
+if graph_path is not None and graph_path.endswith('.snap'):
+    from snapshot import load_snapshot
+    G = load_snapshot(graph_path)
+    li = edge_rows(G)
+    place(G, fresh=False)
+else:
+    if graph_path is not None:
+        G = load_edge_list(graph_path, scale=300, size=30, edges=graph_edges)
+        li = edge_rows(G)
+    else:
+        G = Graph(li, InputType.EDGE_LIST, scale=300, size=30, edges=graph_edges)
+    place(G)
 
 # Font
 pygame.font.init()
-font = pygame.font.SysFont('freesansbold.ttf', 32)
-button_font = pygame.font.SysFont('freesansbold.ttf', 18)
+font = labels.font(32)
+button_font = labels.font(18)
 
 # Boxes and buttons
 if True:
@@ -211,7 +167,7 @@ if True:
     texts = []
 
     for l in li:
-        texts.append(str(line + 1) + ': ' + str(l[0]) + ' ' + str(l[1]) + '\n')
+        texts.append(str(line + 1) + ': ' + ' '.join(map(str, l)) + '\n')
         line += 1
 
     line -= 1
@@ -244,19 +200,138 @@ if True:
     wait_warning = font.render('Please, wait until running algorithm stop', True, (0, 0, 0))
 
 
-tick = 0
+def draw_panels():
+    # Everything but the graph, drawn once per change of the panels' state.
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill((255, 255, 255))
+
+    # Input box
+    background.blit(edges_input_box_header, (input_box.x+5, input_box.y-22))
+
+    # Only the lines that fit in the box, scrolled to keep the edited one.
+    rows = (input_box.height - 10) // 22
+    top = max(0, line - rows + 1)
+    for i in range(top, min(len(texts), top + rows)):
+        background.blit(labels.render(texts[i], 32, color_active if input_box_active else color_inactive), (input_box.x + 5, input_box.y+5+22*(i - top)))
+
+    pygame.draw.rect(background, color_active if input_box_active else color_inactive, input_box, 4)
+
+
+    # Panels
+    pygame.draw.rect(background, color_active if buttons_box_active else color_inactive, buttons_box, 4)
+
+    pygame.draw.rect(background, color_active if alg_box_active else color_inactive, alg_box, 4)
+
+    pygame.draw.rect(background, color_active if buttons_box_active else color_inactive, update_graph_button, 2)
+    background.blit(update_graph_button_text, (update_graph_button.x+5, update_graph_button.y+22))
+
+    pygame.draw.rect(background, color_active if buttons_box_active else color_inactive, clear_graph_button, 2)
+    background.blit(clear_graph_button_text, (clear_graph_button.x+10, clear_graph_button.y+22))
+
+    # Buttons and texts
+    pygame.draw.rect(background, color_active if alg_box_active else color_inactive, eulers_way_button, 2)
+    background.blit(eulers_way_button_text, (eulers_way_button.x+22, eulers_way_button.y+22))
+    pygame.draw.rect(background, color_active if alg_box_active else color_inactive, eulers_cycle_button, 2)
+    background.blit(eulers_cycle_button_text, (eulers_cycle_button.x+17, eulers_cycle_button.y+22))
+
+    pygame.draw.rect(background, color_active if alg_box_active else color_inactive, gamils_way_button, 2)
+    background.blit(gamils_way_button_text, (gamils_way_button.x+12, gamils_way_button.y+22))
+    pygame.draw.rect(background, color_active if alg_box_active else color_inactive, gamils_cycle_button, 2)
+    background.blit(gamils_cycle_button_text, (gamils_cycle_button.x+7, gamils_cycle_button.y+22))
+
+    pygame.draw.rect(background, color_active if graph_box_active else color_inactive, graph_box, 4)
+
+    return background
+
+FPS = 60
+ANIMATION_STEP = 400    # ms between two steps of a shown way or cycle
+SIMULATION_SPEED = 3    # simulated seconds per real second
+PHYSICS_BUDGET = 6      # ms of physics steps per frame, past the first step
+WAY_LABEL = 60          # characters of a found way shown under the graph
+
+clock = pygame.time.Clock()
 dt = 0.01
+lag = 0.0
+last_animation = 0
+ui_dirty = True
+graph_dirty = True
 
 last_edge = None
 alg_count = 0
 algo_active = False
 
+# Euler and Hamilton searches: finished is an (algorithm, way) pair waiting
+# to be shown, job the search running in the background; Esc cancels it.
+# The search reads G itself, so the graph is not edited until the worker
+# hands the job back, even after a cancel.
+NOT_FOUND = {'eulers_way': 2, 'eulers_cycle': 3, 'gamils_way': 4, 'gamils_cycle': 5}
+executor = Executor()
+job = None
+finished = None
+
+# Graph view: wheel zooms, right button drag pans, left button drags a vertex
+# and pins it; a click on a pinned vertex releases it. Home resets the view.
+camera = Camera()
+dragged = None
+drag_moved = False
+was_pinned = False
+panning = False
+
+# Profiling: F3 shows the average frame time per phase and the per frame
+# counters. GRAPH_TRACE=path writes a Chrome trace of the session there on
+# exit, GRAPH_PROFILE=path the cProfile stats of the main thread.
+TRACE_PATH = os.environ.get('GRAPH_TRACE')
+PROFILE_PATH = os.environ.get('GRAPH_PROFILE')
+STATS_STEP = 500        # ms between two updates of the stats overlay
+profiler = FrameProfiler(trace=TRACE_PATH is not None)
+show_stats = False
+stats_lines = []
+last_stats = 0
+last_search = None
+rendered = labels.rendered
+session = profile_session(PROFILE_PATH)
+
 running = True
 while running:
+    profiler.frame()
+    profiler.phase('events')
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
-        if event.type == pygame.MOUSEBUTTONDOWN:
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.VIDEOEXPOSE):
+            ui_dirty = True
+        if event.type == pygame.MOUSEWHEEL:
+            if graph_box.collidepoint(pygame.mouse.get_pos()):
+                camera.zoom_at(*pygame.mouse.get_pos(), 1.1**event.y)
+                graph_dirty = True
+        if event.type == pygame.MOUSEBUTTONDOWN and graph_box.collidepoint(event.pos):
+            if event.button == 1:
+                dragged = G.vertex_at(*camera.to_world(*event.pos), 30)
+                if dragged is not None:
+                    drag_moved = False
+                    was_pinned = dragged.stable
+                    G.set_vertex(dragged, stable=True)
+                    relax(G)
+            elif event.button == 3:
+                panning = True
+        if event.type == pygame.MOUSEMOTION:
+            if dragged is not None:
+                G.set_vertex(dragged, Point(*camera.to_world(*event.pos)))
+                drag_moved = True
+                relax(G)
+                graph_dirty = True
+            elif panning:
+                camera.pan(*event.rel)
+                graph_dirty = True
+        if event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1 and dragged is not None:
+                if not drag_moved and was_pinned:
+                    G.set_vertex(dragged, stable=False)
+                    relax(G)
+                dragged = None
+            elif event.button == 3:
+                panning = False
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button < 4:
             show_warning = 0
             input_box_active = buttons_box_active = alg_box_active = graph_box_active = False
             if input_box.collidepoint(event.pos):
@@ -268,8 +343,10 @@ while running:
             if graph_box.collidepoint(event.pos):
                 graph_box_active = True
             if update_graph_button.collidepoint(event.pos):
-                if is_valid_edges_input(texts):
-                    li = []
+                if job is not None:
+                    show_warning = 6
+                elif is_valid_edges_input(texts):
+                    rows = []
                     for text in texts:
                         t = [a for a in text.split(' ') if a != '' and a != '\n']
                         if len(t) > 1:
@@ -277,15 +354,15 @@ while running:
                             if len(t) < 3:
                                 if v[-1] == '\n':
                                     v = v[:-1]
-                                li.append([v])
+                                rows.append([v])
                             else:
                                 u = t[2]
                                 if u[-1] == '\n':
                                     u = u[:-1]
-                                li.append([v, u])
-                    G = Graph(li, InputType.EDGE_LIST, scale=300, size=30, edges=graph_edges)
-                    G.generate_positions(graph_edges)
-                    edge_eqc = G.eq_classes()
+                                rows.append([v, u])
+                    # Only the edited rows change the graph, the rest keeps its layout.
+                    G.edit(li, rows)
+                    li = rows
 
                     eulers_way = []
                     show_eulers_way = False
@@ -299,56 +376,33 @@ while running:
                     print(G)
                 else:
                     show_warning = 1
+            request = None
             if eulers_way_button.collidepoint(event.pos):
-                if algo_active:
-                    show_warning = 6
-                else:
-                    eulers_way = G.eulers_way()
-                    if len(eulers_way) == 0:
-                        show_warning = 2
-                    else: 
-                        show_eulers_way = True
-                        chain = font.render('Chain: ' + str(eulers_way), True, (0, 0, 0))
-                        print(eulers_way)
+                request = 'eulers_way'
             if eulers_cycle_button.collidepoint(event.pos):
-                if algo_active:
-                    show_warning = 6
-                else:
-                    eulers_cycle = G.eulers_cycle()
-                    if len(eulers_cycle) == 0:
-                        show_warning = 3
-                    else: 
-                        show_eulers_cycle = True
-                        chain = font.render('Cycle: ' + str(eulers_cycle), True, (0, 0, 0))
-                        print(eulers_cycle)
+                request = 'eulers_cycle'
             if gamils_way_button.collidepoint(event.pos):
-                if algo_active:
-                    show_warning = 6
-                else:
-                    gamils_way = G.gamils_way()
-                    if len(gamils_way) == 0:
-                        show_warning = 4
-                    else:
-                        show_gamils_way = True
-                        chain = font.render('Chain: ' + str(gamils_way), True, (0, 0, 0))
-                        print(gamils_way)
+                request = 'gamils_way'
             if gamils_cycle_button.collidepoint(event.pos):
-                if algo_active:
+                request = 'gamils_cycle'
+            if request is not None:
+                if algo_active or job is not None:
                     show_warning = 6
                 else:
-                    gamils_cycle = G.gamils_cycle()
-                    if len(gamils_cycle) == 0:
-                        show_warning = 5
+                    way = results.lookup(results.key(G, request))
+                    if way is None:
+                        job = executor.submit(G, request, copy=False)
                     else:
-                        show_gamils_cycle = True
-                        chain = font.render('Cycle: ' + str(gamils_cycle), True, (0, 0, 0))
-                        print(gamils_cycle)
+                        finished = (request, way)
             if clear_graph_button.collidepoint(event.pos):
+                if job is not None:
+                    job.cancel()
 
                 texts = ['1: ']
                 line = 0
-                G.clear()
-                edge_eqc = []
+                li = []
+                G = Graph(li, InputType.EDGE_LIST, scale=300, size=30, edges=graph_edges)
+                place(G)
 
                 eulers_way = []
                 show_eulers_way = False
@@ -360,7 +414,17 @@ while running:
                 show_gamils_cycle = False
                 
         if event.type == pygame.KEYDOWN:
-            if input_box_active:
+            if event.key == pygame.K_s and event.mod & pygame.KMOD_CTRL:
+                from snapshot import save_snapshot
+                save_snapshot(G, snapshot_path)
+                print('Saved ' + snapshot_path)
+            elif event.key == pygame.K_HOME and not input_box_active:
+                camera = Camera()
+            elif event.key == pygame.K_ESCAPE and job is not None:
+                job.cancel()
+            elif event.key == pygame.K_F3:
+                show_stats = not show_stats
+            elif input_box_active:
                 if event.key == pygame.K_RETURN:
                     texts[line] += '\n'
                     line += 1
@@ -374,47 +438,65 @@ while running:
                 else:
                     texts[line] += event.unicode
 
-    screen.fill((255, 255, 255))
-
-
-    # Panels and texts
-    if True:
-        # Input box
-        screen.blit(edges_input_box_header, (input_box.x+5, input_box.y-22))
-
-        edges_input = [font.render(text, True, color_active if input_box_active else color_inactive) for text in texts]
-        for i in range(len(edges_input)):
-            screen.blit(edges_input[i], (input_box.x + 5, input_box.y+5+22*i))
-
-        pygame.draw.rect(screen, color_active if input_box_active else color_inactive, input_box, 4)
-
-
-        # Panels
-        pygame.draw.rect(screen, color_active if buttons_box_active else color_inactive, buttons_box, 4)
-
-        pygame.draw.rect(screen, color_active if alg_box_active else color_inactive, alg_box, 4)
-
-        pygame.draw.rect(screen, color_active if buttons_box_active else color_inactive, update_graph_button, 2)
-        screen.blit(update_graph_button_text, (update_graph_button.x+5, update_graph_button.y+22))
-
-        pygame.draw.rect(screen, color_active if buttons_box_active else color_inactive, clear_graph_button, 2)
-        screen.blit(clear_graph_button_text, (clear_graph_button.x+10, clear_graph_button.y+22))
-
-        # Buttons and texts
-        pygame.draw.rect(screen, color_active if alg_box_active else color_inactive, eulers_way_button, 2)
-        screen.blit(eulers_way_button_text, (eulers_way_button.x+22, eulers_way_button.y+22))
-        pygame.draw.rect(screen, color_active if alg_box_active else color_inactive, eulers_cycle_button, 2)
-        screen.blit(eulers_cycle_button_text, (eulers_cycle_button.x+17, eulers_cycle_button.y+22))
-
-        pygame.draw.rect(screen, color_active if alg_box_active else color_inactive, gamils_way_button, 2)
-        screen.blit(gamils_way_button_text, (gamils_way_button.x+12, gamils_way_button.y+22))
-        pygame.draw.rect(screen, color_active if alg_box_active else color_inactive, gamils_cycle_button, 2)
-        screen.blit(gamils_cycle_button_text, (gamils_cycle_button.x+7, gamils_cycle_button.y+22))
-
-        pygame.draw.rect(screen, color_active if graph_box_active else color_inactive, graph_box, 4)
+    # Searches run on the executor's thread; a result only counts if the job
+    # is still the current one and the graph has not changed since.
+    profiler.phase('jobs')
+    for done, way, error in executor.poll():
+        if done.started is not None:
+            profiler.span(done.algorithm, done.started, done.ended,
+                          args={'n': done.snapshot.n, 'm': done.snapshot.m, 'error': repr(error)})
+            last_search = (done.algorithm, done.ended - done.started)
+        if done is job:
+            job = None
+            if error is None and done.key == results.key(G, done.algorithm):
+                way = [G.find_vertex(v.name) for v in way]
+                results.put(done.key, way)
+                finished = (done.algorithm, way)
+    if job is not None:
+        graph_dirty = True
+
+    if finished is not None:
+        algorithm, way = finished
+        finished = None
+        graph_dirty = True
+        if len(way) == 0:
+            show_warning = NOT_FOUND[algorithm]
+        else:
+            if algorithm == 'eulers_way':
+                eulers_way = way
+                show_eulers_way = True
+            elif algorithm == 'eulers_cycle':
+                eulers_cycle = way
+                show_eulers_cycle = True
+            elif algorithm == 'gamils_way':
+                gamils_way = way
+                show_gamils_way = True
+            else:
+                gamils_cycle = way
+                show_gamils_cycle = True
+            chain = font.render(way_label(algorithm, way), True, (0, 0, 0))
+            print(way)
+
+    profiler.phase('panels')
+    now = pygame.time.get_ticks()
+    if ui_dirty:
+        background = draw_panels()
+        screen.blit(background, (0, 0))
+        graph_dirty = True
+
+    if show_stats and now - last_stats >= STATS_STEP:
+        last_stats = now
+        stats_lines = profiler.lines()
+        if last_search is not None:
+            stats_lines.append('%s %.3f s' % last_search)
+        graph_dirty = True
 
     # Show algorithms
-    if tick % 200 == 0:
+    profiler.phase('animation')
+    if now - last_animation >= ANIMATION_STEP:
+        last_animation = now
+        if show_eulers_way or show_eulers_cycle or show_gamils_cycle or show_gamils_way:
+            graph_dirty = True
         if show_eulers_way:
             eulers_way, alg_count, last_edge, show_eulers_way = show_way(eulers_way, G, alg_count, last_edge, show_eulers_way)
             algo_active = show_eulers_way
@@ -428,40 +510,103 @@ while running:
             gamils_way, alg_count, last_edge, show_gamils_way = show_way(gamils_way, G, alg_count, last_edge, show_gamils_way)
             algo_active = show_gamils_way
 
-
-    if algo_active:
-        screen.blit(chain, (graph_edges[0].x + graph_edges[1].x * 0.2, \
-                            graph_edges[0].y + graph_edges[1].y * 0.9))
-
-    # draw nodes and edges
-    for es in edge_eqc:
-        draw_edge(screen, es, 300, 20)
-    for v in G.V:
-        draw_node(screen, v.color, v.pos(), 30, name=v.name)
-
-    # warnings
-    if show_warning == 1:
-        screen.blit(wrong_edges_input_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-    elif show_warning == 2:
-        screen.blit(no_eulers_way_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-    elif show_warning == 3:
-        screen.blit(no_eulers_cycle_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-    elif show_warning == 4:
-        screen.blit(no_gamils_way_warning, (graph_edges[0].x + graph_edges[1].x * 0.08, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-    elif show_warning == 5:
-        screen.blit(no_gamils_cycle_warning, (graph_edges[0].x + graph_edges[1].x * 0.08, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-    elif show_warning == 6:
-        screen.blit(wait_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
-                                                graph_edges[0].y + graph_edges[1].y * 0.8))
-
-
-    pygame.display.update()
-
-    G.update_positions(dt)
-
-    tick += 1
+    # Graph layer, redrawn over its own part of the background
+    if graph_dirty:
+        profiler.phase('edges')
+        screen.set_clip(graph_box)
+        screen.blit(background, graph_box, graph_box)
+
+        if algo_active:
+            screen.blit(chain, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                graph_edges[0].y + graph_edges[1].y * 0.9))
+
+        # draw the nodes and edges in view
+        view = camera.view(graph_box)
+        drawn = 0
+        for es in G.spatial_index().classes(*view, 300):
+            if edge_visible(es, 300, view):
+                draw_edge(screen, es, 300, 20, camera)
+                drawn += len(es)
+        profiler.count('edges', drawn)
+        profiler.phase('nodes')
+        x0, y0, x1, y1 = view
+        visible = G.spatial_index().query(x0 - 30, y0 - 30, x1 + 30, y1 + 30)
+        for v in visible:
+            draw_node(screen, v.color, camera.to_screen(v.r.x, v.r.y), max(1, round(30 * camera.zoom)),
+                      name=v.name, borderline=4 if v.stable else 2)
+        profiler.count('vertexes', len(visible))
+
+        profiler.phase('text')
+        if job is not None:
+            if job.cancelled.is_set():
+                progress = labels.render('Cancelling %s' % job.algorithm, 32, (0, 0, 0))
+            else:
+                progress = labels.render('Solving %s: %d%%, Esc cancels' % (job.algorithm, job.progress * 100), 32, (0, 0, 0))
+            screen.blit(progress, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                   graph_edges[0].y + graph_edges[1].y * 0.8))
+
+        # warnings
+        if show_warning == 1:
+            screen.blit(wrong_edges_input_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+        elif show_warning == 2:
+            screen.blit(no_eulers_way_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+        elif show_warning == 3:
+            screen.blit(no_eulers_cycle_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+        elif show_warning == 4:
+            screen.blit(no_gamils_way_warning, (graph_edges[0].x + graph_edges[1].x * 0.08, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+        elif show_warning == 5:
+            screen.blit(no_gamils_cycle_warning, (graph_edges[0].x + graph_edges[1].x * 0.08, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+        elif show_warning == 6:
+            screen.blit(wait_warning, (graph_edges[0].x + graph_edges[1].x * 0.2, \
+                                                    graph_edges[0].y + graph_edges[1].y * 0.8))
+
+        if show_stats:
+            for i, text in enumerate(stats_lines):
+                screen.blit(labels.render(text, 18, (0, 0, 0), (255, 255, 255)), (graph_box.x + 8, graph_box.y + 8 + 14 * i))
+
+        screen.set_clip(None)
+
+    profiler.phase('display')
+    if ui_dirty:
+        pygame.display.update()
+    elif graph_dirty:
+        pygame.display.update(graph_box)
+    ui_dirty = graph_dirty = False
+
+    # Physics steps paced by the clock, so the layout evolves at the same
+    # speed whatever the frame rate; once the steps of a frame have taken
+    # PHYSICS_BUDGET the backlog is dropped, so slow steps slow the layout
+    # down instead of the window. The integrator picks each step's dt and
+    # stops once the layout settles.
+    profiler.count('surfaces', labels.rendered - rendered)
+    rendered = labels.rendered
+    profiler.phase('idle')
+    lag += clock.tick(FPS) / 1000 * SIMULATION_SPEED
+    profiler.phase('physics')
+    steps = 0
+    physics_end = pygame.time.get_ticks() + PHYSICS_BUDGET
+    while lag > 0:
+        advanced = G.update_positions(dt)
+        if advanced == 0:
+            break
+        lag -= advanced
+        steps += 1
+        if pygame.time.get_ticks() >= physics_end:
+            lag = min(lag, 0)
+            break
+    if steps == 0:
+        lag = 0
+    if steps > 0:
+        graph_dirty = True
+    profiler.count('steps', steps)
+
+profiler.frame()
+end_session(session, PROFILE_PATH)
+if TRACE_PATH is not None:
+    profiler.export(TRACE_PATH)
+    print('Saved ' + TRACE_PATH)
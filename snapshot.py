@@ -0,0 +1,154 @@
+
+import gc
+import json
+import struct
+import numpy as np
+from graph import *
+
+# Layout: MAGIC, little-endian u64 header length, JSON header, then the raw
+# arrays, each 64-byte aligned. Array offsets in the header are relative to
+# the first aligned byte after the header, so every array can be mapped.
+MAGIC = b'GRAPHSN1'
+ALIGN = 64
+
+def align(k:int) -> int:
+    return (k + ALIGN - 1) // ALIGN * ALIGN
+
+def graph_arrays(G):
+    vs = list(G.V)
+    idx = {v: i for i, v in enumerate(vs)}
+    names = [v.name.encode('utf-8') for v in vs]
+    offsets = np.zeros(len(vs) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in names], out=offsets[1:])
+    ev = []
+    eu = []
+    w = []
+    oriented = G.ortype == EdgeOrType.ORIENTED
+    for v, us in G.adj.items():
+        i = idx[v]
+        for u, es in us.items():
+            j = idx[u]
+            if oriented or i <= j:
+                for e in es:
+                    ev.append(i)
+                    eu.append(j)
+                    w.append(e.w)
+    arrays = {
+        'names': np.frombuffer(b''.join(names), dtype=np.uint8),
+        'name_offsets': offsets,
+        'r': np.array([(v.r.x, v.r.y) for v in vs], dtype=np.float64).reshape(-1, 2),
+        'v': np.array([(v.v.x, v.v.y) for v in vs], dtype=np.float64).reshape(-1, 2),
+        'stable': np.array([v.stable for v in vs], dtype=np.bool_),
+        'degree': np.array([v.degree for v in vs], dtype=np.int64),
+        'ev': np.array(ev, dtype=np.int64),
+        'eu': np.array(eu, dtype=np.int64),
+    }
+    if G.wtype == EdgeWType.WEIGHTED:
+        arrays['w'] = np.array(w, dtype=np.float64)
+    return arrays
+
+def save_snapshot(G, path:str):
+    arrays = graph_arrays(G)
+    header = {
+        'ortype': G.ortype.name,
+        'wtype': G.wtype.name,
+        'scale': G.scale,
+        'size': G.size,
+        'edges': [G.edges[0].x, G.edges[0].y, G.edges[1].x, G.edges[1].y],
+        'theta': G.theta,
+        'arrays': {},
+    }
+    offset = 0
+    for name, a in arrays.items():
+        header['arrays'][name] = {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset}
+        offset = align(offset + a.nbytes)
+    head = json.dumps(header).encode('utf-8')
+    start = align(len(MAGIC) + 8 + len(head))
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(head)) + head)
+        for name, a in arrays.items():
+            f.seek(start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(a).tobytes())
+        f.truncate(start + offset)
+
+def read_snapshot(path:str):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(path + ' is not a graph snapshot')
+        n = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(n).decode('utf-8'))
+    start = align(len(MAGIC) + 8 + n)
+    arrays = {}
+    for name, a in header['arrays'].items():
+        shape = tuple(a['shape'])
+        if 0 in shape:
+            arrays[name] = np.zeros(shape, dtype=a['dtype'])
+        else:
+            arrays[name] = np.memmap(path, dtype=a['dtype'], mode='r', offset=start + a['offset'], shape=shape)
+    return header, arrays
+
+def load_snapshot(path:str):
+    # The index is built in bulk, as Graph.copy does: edges are grouped by
+    # their ends, every adjacency list is made in one go and the degrees are
+    # the saved ones instead of being counted edge by edge. The collector is
+    # paused meanwhile, as it would otherwise rescan the growing heap.
+    header, a = read_snapshot(path)
+    e = header['edges']
+    G = Graph([], InputType.NO_INPUT, wtype=EdgeWType[header['wtype']], ortype=EdgeOrType[header['ortype']],
+              scale=header['scale'], size=header['size'], edges=(Point(e[0], e[1]), Point(e[2], e[3])))
+    G.theta = header['theta']
+    paused = gc.isenabled()
+    gc.disable()
+    try:
+        build_index(G, a)
+    finally:
+        if paused:
+            gc.enable()
+    G.version += 1
+    G.n = len(G.V)
+    G.m = len(G.E)
+    return G
+
+def build_index(G, a):
+    blob = bytes(a['names'])
+    offsets = a['name_offsets'].tolist()
+    vs = []
+    for i, (r, v, stable, d) in enumerate(zip(a['r'].tolist(), a['v'].tolist(), a['stable'].tolist(), a['degree'].tolist())):
+        x = Vertex(blob[offsets[i]:offsets[i + 1]].decode('utf-8'), stable=stable, degree=d, r=Point(*r), v=Point(*v))
+        G.vertexes[x.name] = x
+        G.adj[x] = {}
+        G.radj[x] = {}
+        vs.append(x)
+    G.V.update(vs)
+    adj = list(G.adj.values())
+    radj = list(G.radj.values())
+    ev = np.asarray(a['ev'])
+    eu = np.asarray(a['eu'])
+    order = np.lexsort((eu, ev))
+    ev = ev[order]
+    eu = eu[order]
+    w = np.asarray(a['w'])[order].tolist() if 'w' in a else None
+    start = np.flatnonzero(np.r_[True, (ev[1:] != ev[:-1]) | (eu[1:] != eu[:-1])]) if len(ev) > 0 else np.zeros(0, dtype=np.int64)
+    bounds = np.r_[start, len(ev)].tolist()
+    unoriented = G.ortype == EdgeOrType.UNORIENTED
+    edges = []
+    for k, (i, j) in enumerate(zip(ev[start].tolist(), eu[start].tolist())):
+        v = vs[i]
+        u = vs[j]
+        s, t = bounds[k], bounds[k + 1]
+        if w is None:
+            es = [Edge(v, u) for _ in range(t - s)]
+        else:
+            es = [Edge(v, u, '', True, x) for x in w[s:t]]
+        adj[i][u] = es
+        radj[j][v] = es[:]
+        edges += es
+        if unoriented and i != j:
+            if w is None:
+                es = [Edge(u, v) for _ in range(t - s)]
+            else:
+                es = [Edge(u, v, '', True, x) for x in w[s:t]]
+            adj[j][v] = es
+            radj[i][u] = es[:]
+            edges += es
+    G.E.update(edges)
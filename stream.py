@@ -0,0 +1,125 @@
+
+import gc
+import gzip
+from graph import *
+
+def open_text(path:str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+def read_chunks(path:str, chunk_size:int=1 << 20):
+    with open_text(path) as f:
+        while True:
+            lines = f.readlines(chunk_size)
+            if len(lines) == 0:
+                return
+            yield lines
+
+def parse_rows(chunks, weighted:bool=False):
+    # Yields (v, u, w) name rows; u is None for a lone vertex. Blank lines
+    # and lines starting with '#' or '%' are skipped.
+    for lines in chunks:
+        for line in lines:
+            t = line.split()
+            if len(t) == 0 or t[0][0] in '#%':
+                continue
+            if len(t) < 2:
+                yield t[0], None, 0
+            elif weighted:
+                yield t[0], t[1], float(t[2]) if len(t) > 2 else 0.0
+            else:
+                yield t[0], t[1], 0
+
+class Interner:
+    # Maps vertex names to dense ids in order of appearance; each distinct
+    # name is kept once, in names, and becomes the name of its vertex.
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __call__(self, name:str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def __len__(self):
+        return len(self.names)
+
+def intern_rows(rows, ids:Interner):
+    for v, u, w in rows:
+        yield ids(v), None if u is None else ids(u), w
+
+def group_edges(rows):
+    # (v id, u id) -> the weights of the edges v -> u, in file order.
+    pairs = {}
+    for v, u, w in rows:
+        if u is not None:
+            ws = pairs.get((v, u))
+            if ws is None:
+                pairs[(v, u)] = [w]
+            else:
+                ws.append(w)
+    return pairs
+
+def build_index(G, names, pairs):
+    # As snapshot.build_index: every vertex is made once, every adjacency
+    # list of a pair in one go, with the reversed edges of an unoriented
+    # graph appended to the (u, v) lists, and the degrees are counted by id.
+    vs = [Vertex(name) for name in names]
+    for x in vs:
+        G.vertexes[x.name] = x
+        G.adj[x] = {}
+        G.radj[x] = {}
+    G.V.update(vs)
+    adj = list(G.adj.values())
+    radj = list(G.radj.values())
+    degree = [0] * len(vs)
+    weighted = G.wtype == EdgeWType.WEIGHTED
+    unoriented = G.ortype == EdgeOrType.UNORIENTED
+    edges = []
+    for (i, j), ws in pairs.items():
+        v = vs[i]
+        u = vs[j]
+        if weighted:
+            es = [Edge(v, u, '', True, w) for w in ws]
+        else:
+            es = [Edge(v, u) for w in ws]
+        adj[i].setdefault(u, []).extend(es)
+        radj[j].setdefault(v, []).extend(es)
+        edges += es
+        degree[i] += len(es)
+        if unoriented:
+            degree[j] += len(es)
+            if i != j:
+                es = [e.reverse() for e in es]
+                adj[j].setdefault(v, []).extend(es)
+                radj[i].setdefault(u, []).extend(es)
+                edges += es
+    for x, d in zip(vs, degree):
+        x.degree = d
+    G.E.update(edges)
+
+def load_edge_list(path:str, wtype:EdgeWType=EdgeWType.UNWEIGHTED, ortype:EdgeOrType=EdgeOrType.UNORIENTED,
+                   chunk_size:int=1 << 20, **kwargs):
+    # The file is read a chunk at a time and only the ids of each edge are
+    # kept until the index is built; the collector is paused meanwhile, as
+    # in snapshot.load_snapshot.
+    G = Graph([], InputType.NO_INPUT, wtype=wtype, ortype=ortype, **kwargs)
+    ids = Interner()
+    rows = parse_rows(read_chunks(path, chunk_size), wtype == EdgeWType.WEIGHTED)
+    paused = gc.isenabled()
+    gc.disable()
+    try:
+        pairs = group_edges(intern_rows(rows, ids))
+        build_index(G, ids.names, pairs)
+    finally:
+        if paused:
+            gc.enable()
+    G.version += 1
+    G.n = len(G.V)
+    G.m = len(G.E)
+    return G
@@ -0,0 +1,184 @@
+
+import random
+from collections import Counter
+import pytest
+from graph import *
+
+ORIENTATIONS = [EdgeOrType.UNORIENTED, EdgeOrType.ORIENTED]
+
+def random_rows(rng, n:int, m:int, weighted:bool=False):
+    return [[str(rng.randrange(n)), str(rng.randrange(n))] + ([rng.randint(1, 3)] if weighted else [])
+            for i in range(m)]
+
+def edge_counts(G):
+    # The edges as (v, u, w) counts, each unoriented edge once.
+    oriented = G.ortype == EdgeOrType.ORIENTED
+    return Counter((e.v.name, e.u.name, e.w) for e in G.E if oriented or e.v.name <= e.u.name)
+
+def row_counts(rows, oriented:bool):
+    return Counter(row_key(row, oriented) for row in rows if len(row) > 1)
+
+def components(names, pairs):
+    parent = {v: v for v in names}
+    def root(v):
+        while parent[v] != v:
+            v = parent[v]
+        return v
+    for v, u in pairs:
+        parent[root(v)] = root(u)
+    return len({root(v) for v in names})
+
+def euler_exists(rows, oriented:bool, closed:bool):
+    pairs = [(v, u) for v, u in rows]
+    if len(pairs) == 0 or components({x for p in pairs for x in p}, pairs) > 1:
+        return False
+    balance = Counter()
+    for v, u in pairs:
+        balance[v] += 1
+        balance[u] += -1 if oriented else 1
+    if oriented:
+        odd = sorted(b for b in balance.values() if b != 0)
+        return odd == ([] if closed else [-1, 1])
+    return len([b for b in balance.values() if b % 2 == 1]) == (0 if closed else 2)
+
+def check_walk(G, way, closed:bool):
+    oriented = G.ortype == EdgeOrType.ORIENTED
+    steps = Counter((a.name, b.name) if oriented else tuple(sorted((a.name, b.name))) for a, b in zip(way, way[1:]))
+    assert steps == Counter((v, u) for v, u, w in edge_counts(G).elements())
+    assert not closed or way[0] == way[-1]
+
+@pytest.mark.parametrize('ortype', ORIENTATIONS)
+def test_hierholzer_matches_euler_conditions(ortype):
+    rng = random.Random(1)
+    oriented = ortype == EdgeOrType.ORIENTED
+    for i in range(500):
+        rows = random_rows(rng, rng.randint(1, 6), rng.randint(1, 9))
+        G = Graph(rows, InputType.EDGE_LIST, ortype=ortype)
+        for closed, way in ((True, G.eulers_cycle()), (False, G.eulers_way())):
+            assert (len(way) > 0) == euler_exists(rows, oriented, closed)
+            if len(way) > 0:
+                check_walk(G, way, closed)
+
+def test_eulers_way_from_given_start():
+    G = Graph([['A', 'B'], ['B', 'C'], ['C', 'A'], ['A', 'D']], InputType.EDGE_LIST)
+    assert G.eulers_way('D')[0].name == 'D'
+    assert G.eulers_way('A')[0].name == 'A'
+    assert G.eulers_way('B') == []
+
+def test_connectivity_follows_changes():
+    rng = random.Random(2)
+    G = Graph([], InputType.NO_INPUT)
+    for i in range(300):
+        if rng.random() < 0.6 or G.m == 0:
+            G.add_edge(str(rng.randrange(12)), str(rng.randrange(12)))
+        else:
+            G.remove_edge(rng.choice(list(G.E)))
+        if rng.random() < 0.1:
+            G.remove_vertex(str(rng.randrange(12)))
+        pairs = [(e.v.name, e.u.name) for e in G.E]
+        assert G.connectivity.components_count() == components(G.vertexes, pairs)
+        for e in G.E:
+            assert G.connectivity.find(e.v) is G.connectivity.find(e.u)
+
+def test_gamils_cycle_on_dirac_graph():
+    rng = random.Random(3)
+    n = 60
+    rows = [[str(v), str(u)] for v in range(n) for u in range(v + 1, n) if rng.random() < 0.7]
+    G = Graph(rows, InputType.EDGE_LIST)
+    assert G.is_gamiltons_graph()
+    for way, closed in ((G.gamils_cycle(), True), (G.gamils_way(), False)):
+        assert len(way) == n + closed
+        assert len(set(way)) == n
+        assert all(G.find_edge(a, b) is not None for a, b in zip(way, way[1:]))
+
+@pytest.mark.parametrize('ortype', ORIENTATIONS)
+def test_connectivity_list_loader(ortype, tmp_path):
+    rows = [['1:', '2', '3'], ['2', '1', '2'], ['3']]
+    G = Graph(rows, InputType.CONNECTIVITY_LIST, ortype=ortype)
+    if ortype == EdgeOrType.UNORIENTED:
+        assert edge_counts(G) == Counter({('1', '2', 0): 1, ('1', '3', 0): 1, ('2', '2', 0): 1})
+    else:
+        assert edge_counts(G) == Counter({('1', '2', 0): 1, ('1', '3', 0): 1, ('2', '1', 0): 1, ('2', '2', 0): 1})
+    path = tmp_path / 'list.txt'
+    path.write_text('1 2 0.5 3 2\n2 3 1\n')
+    G = Graph(str(path), InputType.CONNECTIVITY_LIST, wtype=EdgeWType.WEIGHTED, ortype=ortype)
+    assert edge_counts(G) == Counter({('1', '2', 0.5): 1, ('1', '3', 2.0): 1, ('2', '3', 1.0): 1})
+
+@pytest.mark.parametrize('ortype', ORIENTATIONS)
+def test_matrix_loaders_match_edge_list(ortype):
+    np = pytest.importorskip('numpy')
+    rng = random.Random(4)
+    oriented = ortype == EdgeOrType.ORIENTED
+    for i in range(50):
+        n = rng.randint(1, 6)
+        rows = [[str(v + 1), str(u + 1)] for v, u in
+                ((rng.randrange(n), rng.randrange(n)) for k in range(rng.randint(0, 10)))]
+        expected = edge_counts(Graph(rows, InputType.EDGE_LIST, ortype=ortype))
+        M = np.zeros((n, n), dtype=int)
+        I = np.zeros((n, len(rows)), dtype=int)
+        for k, (v, u) in enumerate(rows):
+            v, u = int(v) - 1, int(u) - 1
+            if not oriented and u < v:
+                v, u = u, v
+            M[v, u] += 1
+            if not oriented and v != u:
+                M[u, v] += 1
+            I[v, k] = 1
+            I[u, k] = 1 if v == u else (-1 if oriented else 1)
+        assert edge_counts(Graph(M, InputType.CONNECTIVITY_MATRIX, ortype=ortype)) == expected
+        assert edge_counts(Graph(I, InputType.INIDENCE_MATRIX, ortype=ortype)) == expected
+    with pytest.raises(ValueError):
+        Graph(np.array([[1], [1], [1]]), InputType.INIDENCE_MATRIX)
+
+@pytest.mark.parametrize('ortype', ORIENTATIONS)
+def test_diff_rows_and_edit(ortype):
+    rng = random.Random(5)
+    oriented = ortype == EdgeOrType.ORIENTED
+    for i in range(200):
+        old = random_rows(rng, 6, rng.randint(0, 8), weighted=True)
+        new = random_rows(rng, 7, rng.randint(0, 8), weighted=True)
+        added, removed, gone = diff_rows(old, new, oriented)
+        assert row_counts(old, oriented) - Counter(removed) + Counter(added) == row_counts(new, oriented)
+        assert gone == row_names(old) - row_names(new)
+
+        G = Graph(old, InputType.EDGE_LIST, wtype=EdgeWType.WEIGHTED, ortype=ortype)
+        G.generate_positions(G.edges, 'circle', seed=0)
+        kept = {v.name: v.r.copy() for v in G.V if v.name in row_names(new)}
+        G.edit(old, new, seed=0)
+        H = Graph(new, InputType.EDGE_LIST, wtype=EdgeWType.WEIGHTED, ortype=ortype)
+        assert edge_counts(G) == edge_counts(H)
+        assert sorted((v.name, v.degree) for v in G.V) == sorted((v.name, v.degree) for v in H.V)
+        assert (G.n, G.m) == (H.n, H.m)
+        assert all(G.find_vertex(name).r == r for name, r in kept.items())
+
+def test_remove_nodes_view_leaves_base_alone():
+    G = Graph([['A', 'B'], ['B', 'C'], ['C', 'A'], ['A', 'A']], InputType.EDGE_LIST)
+    before = (edge_counts(G), sorted((v.name, v.degree) for v in G.V))
+    H = G.remove_nodes({'A'})
+    H.add_edge('B', 'X')
+    assert edge_counts(H) == Counter({('B', 'C', 0): 1, ('B', 'X', 0): 1})
+    assert sorted((v.name, v.degree) for v in H.V) == [('B', 2), ('C', 1), ('X', 1)]
+    assert (H.n, H.m) == (3, 4) and H.coherent()
+    assert (edge_counts(G), sorted((v.name, v.degree) for v in G.V)) == before
+
+@pytest.mark.parametrize('wtype', [EdgeWType.UNWEIGHTED, EdgeWType.WEIGHTED])
+@pytest.mark.parametrize('ortype', ORIENTATIONS)
+def test_snapshot_round_trip(wtype, ortype, tmp_path):
+    pytest.importorskip('numpy')
+    from snapshot import save_snapshot, load_snapshot
+    rng = random.Random(6)
+    rows = random_rows(rng, 30, 80, weighted=wtype == EdgeWType.WEIGHTED) + [['lone'], ['é']]
+    G = Graph(rows, InputType.EDGE_LIST, wtype=wtype, ortype=ortype)
+    G.generate_positions(G.edges, 'grid', seed=1)
+    G.find_vertex('lone').stable = True
+    G.theta = 0.5
+    path = str(tmp_path / 'g.snap')
+    save_snapshot(G, path)
+    H = load_snapshot(path)
+    assert (H.ortype, H.wtype, H.theta, H.n, H.m) == (G.ortype, G.wtype, G.theta, G.n, G.m)
+    assert edge_counts(H) == edge_counts(G)
+    for v in G.V:
+        x = H.find_vertex(v.name)
+        assert (x.r, x.stable, x.degree) == (v.r, v.stable, v.degree)
+    assert H.coherent() == G.coherent()
+    assert len(H.eulers_way()) == len(G.eulers_way())